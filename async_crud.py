@@ -0,0 +1,84 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import cache, models, schemas
+from .crud import conditional_approve
+from .reference import reference_cache
+from .stats import admission_stats
+from collections import Counter
+from datetime import datetime
+
+async def get_calon_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.CalonMahasiswa).where(models.CalonMahasiswa.email == email))
+
+async def create_calon(db: AsyncSession, calon_in: schemas.CalonCreate):
+    await reference_cache.ensure_fresh_async()
+    reference_cache.check_calon(calon_in)
+    if await get_calon_by_email(db, calon_in.email):
+        raise ValueError("Email already registered")
+    calon = models.CalonMahasiswa(**calon_in.dict())
+    db.add(calon)
+    await db.commit()
+    await db.refresh(calon)
+    cache.calon_cache.invalidate(calon.id)
+    admission_stats.record_created(calon.program_studi_id, calon.jalur_masuk_id)
+    return calon
+
+async def get_calon(db: AsyncSession, id: int):
+    return await db.scalar(select(models.CalonMahasiswa).where(models.CalonMahasiswa.id == id))
+
+async def approve_calon(db: AsyncSession, calon_id: int, nim_generator_callable):
+    calon = await get_calon(db, calon_id)
+    if not calon:
+        return None, "not_found"
+    if calon.status == models.StatusEnum.approved:
+        return calon, "already_approved"
+    await reference_cache.ensure_fresh_async()
+    nim = await nim_generator_callable(db, tahun=datetime.now().year, kode_prodi=reference_cache.prodi_kode(calon.program_studi_id))
+    old_status = calon.status
+    calon.nim = nim
+    calon.status = models.StatusEnum.approved
+    calon.approved_at = datetime.now()
+    await db.commit()
+    await db.refresh(calon)
+    cache.calon_cache.invalidate(calon.id)
+    admission_stats.record_status_change(calon.program_studi_id, calon.jalur_masuk_id, old_status, models.StatusEnum.approved)
+    return calon, "approved"
+
+async def approve_calon_batch(db: AsyncSession, batch_in: schemas.BatchApproveIn, nim_batch_callable):
+    query = select(models.CalonMahasiswa)
+    if batch_in.ids is not None:
+        query = query.where(models.CalonMahasiswa.id.in_(batch_in.ids))
+    else:
+        query = query.where(models.CalonMahasiswa.status == batch_in.status)
+    if batch_in.program_studi_id is not None:
+        query = query.where(models.CalonMahasiswa.program_studi_id == batch_in.program_studi_id)
+    if batch_in.jalur_masuk_id is not None:
+        query = query.where(models.CalonMahasiswa.jalur_masuk_id == batch_in.jalur_masuk_id)
+    calons = (await db.scalars(query.order_by(models.CalonMahasiswa.id))).all()
+
+    found_ids = {calon.id for calon in calons}
+    not_found = sorted(set(batch_in.ids) - found_ids) if batch_in.ids is not None else []
+    already_approved = [calon.id for calon in calons if calon.status == models.StatusEnum.approved]
+    await reference_cache.ensure_fresh_async()
+    by_prodi = {}
+    for calon in calons:
+        if calon.status != models.StatusEnum.approved:
+            by_prodi.setdefault(reference_cache.prodi_kode(calon.program_studi_id), []).append(calon)
+
+    now = datetime.now()
+    approved = []
+    transitions = Counter()
+    for kode_prodi, group in by_prodi.items():
+        nims = await nim_batch_callable(db, tahun=now.year, kode_prodi=kode_prodi, count=len(group))
+        for calon, nim in zip(group, nims):
+            if (await db.execute(conditional_approve(calon.id, nim, now))).rowcount:
+                transitions[(calon.program_studi_id, calon.jalur_masuk_id, calon.status)] += 1
+                approved.append(calon.id)
+            else:
+                already_approved.append(calon.id)
+    await db.commit()
+    for calon_id in approved:
+        cache.calon_cache.invalidate(calon_id)
+    for (prodi, jalur, old_status), n in transitions.items():
+        admission_stats.record_status_change(prodi, jalur, old_status, models.StatusEnum.approved, n)
+    return schemas.BatchApproveOut(approved=sorted(approved), already_approved=sorted(already_approved), not_found=not_found)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import async_crud, cache, schemas, utils
+from .reference import InvalidReferenceError
+from .database import AsyncSessionLocal
+
+router = APIRouter()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@router.post("/api/pmb/register", response_model=schemas.CalonOut, status_code=status.HTTP_201_CREATED)
+async def register(calon_in: schemas.CalonCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        calon = await async_crud.create_calon(db, calon_in)
+    except InvalidReferenceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return calon
+
+@router.get("/api/pmb/status/{id}", response_model=schemas.CalonOut)
+async def calon_status(id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached = cache.calon_cache.get(id)
+    if cached is None:
+        generation = cache.calon_cache.generation(id)
+        calon = await async_crud.get_calon(db, id)
+        if not calon:
+            raise HTTPException(status_code=404, detail="Calon tidak ditemukan")
+        cached = utils.calon_cache_entry(calon)
+        cache.calon_cache.set(id, cached, generation)
+    return utils.etag_response(request, *cached)
+
+@router.put("/api/pmb/approve/{id}", response_model=schemas.CalonOut)
+async def approve(id: int, db: AsyncSession = Depends(get_async_db)):
+    calon, reason = await async_crud.approve_calon(db, id, utils.generate_nim_async)
+    if reason == "not_found":
+        raise HTTPException(status_code=404, detail="Calon tidak ditemukan")
+    elif reason == "already_approved":
+        raise HTTPException(status_code=400, detail="Calon sudah disetujui")
+    return calon
+
+@router.put("/api/pmb/approve", response_model=schemas.BatchApproveOut)
+async def approve_batch(batch_in: schemas.BatchApproveIn, db: AsyncSession = Depends(get_async_db)):
+    if batch_in.ids is None and batch_in.program_studi_id is None and batch_in.jalur_masuk_id is None:
+        raise HTTPException(status_code=400, detail="Isi ids atau filter program_studi_id/jalur_masuk_id")
+    return await async_crud.approve_calon_batch(db, batch_in, utils.nim_allocator.allocate_async)
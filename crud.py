@@ -1,17 +1,26 @@
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from . import models, schemas
+from pydantic import ValidationError
+from . import cache, models, schemas
+from .reference import InvalidReferenceError, reference_cache
+from .stats import admission_stats
+from collections import Counter
 from datetime import datetime
 
 def get_calon_by_email(db: Session, email: str):
     return db.query(models.CalonMahasiswa).filter(models.CalonMahasiswa.email == email).first()
 
 def create_calon(db: Session, calon_in: schemas.CalonCreate):
+    reference_cache.check_calon(calon_in)
     if get_calon_by_email(db, calon_in.email):
         raise ValueError("Email already registered")
     calon = models.CalonMahasiswa(**calon_in.dict())
     db.add(calon)
     db.commit()
     db.refresh(calon)
+    cache.calon_cache.invalidate(calon.id)
+    admission_stats.record_created(calon.program_studi_id, calon.jalur_masuk_id)
     return calon
 
 def get_calon(db: Session, id: int):
@@ -23,11 +32,254 @@ def approve_calon(db: Session, calon_id: int, nim_generator_callable):
         return None, "not_found"
     if calon.status == models.StatusEnum.approved:
         return calon, "already_approved"
-    nim = nim_generator_callable(db, tahun=datetime.now().year, kode_prodi=calon.program_studi.kode)
+    nim = nim_generator_callable(db, tahun=datetime.now().year, kode_prodi=reference_cache.prodi_kode(calon.program_studi_id))
+    old_status = calon.status
     calon.nim = nim
     calon.status = models.StatusEnum.approved
     calon.approved_at = datetime.now()
     db.add(calon)
     db.commit()
     db.refresh(calon)
+    cache.calon_cache.invalidate(calon.id)
+    admission_stats.record_status_change(calon.program_studi_id, calon.jalur_masuk_id, old_status, models.StatusEnum.approved)
     return calon, "approved"
+
+BULK_CHUNK_SIZE = 500
+
+def create_calon_bulk(db: Session, rows, chunk_size: int = BULK_CHUNK_SIZE):
+    results = []
+    seen_emails = set()
+    chunk = []
+    for row_no, data, error in rows:
+        if error:
+            results.append(schemas.BulkRowResult(row=row_no, status="validation_error", detail=error))
+            continue
+        try:
+            calon_in = schemas.CalonCreate.parse_obj(data)
+        except ValidationError as e:
+            results.append(schemas.BulkRowResult(row=row_no, status="validation_error", email=data.get("email"), detail=_format_errors(e)))
+            continue
+        try:
+            reference_cache.check_calon(calon_in)
+        except InvalidReferenceError as e:
+            results.append(schemas.BulkRowResult(row=row_no, status="validation_error", email=calon_in.email, detail=str(e)))
+            continue
+        if calon_in.email in seen_emails:
+            results.append(schemas.BulkRowResult(row=row_no, status="duplicate_email", email=calon_in.email))
+            continue
+        seen_emails.add(calon_in.email)
+        chunk.append((row_no, calon_in))
+        if len(chunk) >= chunk_size:
+            results.extend(_insert_calon_chunk(db, chunk))
+            chunk = []
+    if chunk:
+        results.extend(_insert_calon_chunk(db, chunk))
+    results.sort(key=lambda r: r.row)
+    return results
+
+def _format_errors(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+def _insert_calon_chunk(db: Session, chunk):
+    emails = [calon_in.email for _, calon_in in chunk]
+    existing = set(db.scalars(select(models.CalonMahasiswa.email).where(models.CalonMahasiswa.email.in_(emails))))
+    results = []
+    pending = []
+    for row_no, calon_in in chunk:
+        if calon_in.email in existing:
+            results.append(schemas.BulkRowResult(row=row_no, status="duplicate_email", email=calon_in.email))
+        else:
+            pending.append((row_no, calon_in))
+    if not pending:
+        return results
+    stmt = insert(models.CalonMahasiswa).returning(models.CalonMahasiswa.id, models.CalonMahasiswa.email)
+    try:
+        ids = {email: calon_id for calon_id, email in db.execute(stmt, [calon_in.dict() for _, calon_in in pending])}
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return results + _insert_calon_rows(db, pending)
+    for calon_id in ids.values():
+        cache.calon_cache.invalidate(calon_id)
+    for (prodi, jalur), n in Counter((c.program_studi_id, c.jalur_masuk_id) for _, c in pending).items():
+        admission_stats.record_created(prodi, jalur, n)
+    for row_no, calon_in in pending:
+        results.append(schemas.BulkRowResult(row=row_no, status="created", id=ids[calon_in.email], email=calon_in.email))
+    return results
+
+def _insert_calon_rows(db: Session, pending):
+    results = []
+    for row_no, calon_in in pending:
+        calon = models.CalonMahasiswa(**calon_in.dict())
+        db.add(calon)
+        try:
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if get_calon_by_email(db, calon_in.email):
+                results.append(schemas.BulkRowResult(row=row_no, status="duplicate_email", email=calon_in.email))
+            else:
+                results.append(schemas.BulkRowResult(row=row_no, status="validation_error", email=calon_in.email, detail=str(e.orig)))
+            continue
+        cache.calon_cache.invalidate(calon.id)
+        admission_stats.record_created(calon_in.program_studi_id, calon_in.jalur_masuk_id)
+        results.append(schemas.BulkRowResult(row=row_no, status="created", id=calon.id, email=calon_in.email))
+    return results
+
+def conditional_approve(calon_id: int, nim: str, approved_at: datetime):
+    # Hanya mengubah baris yang belum disetujui: batch lain yang menyetujui lebih dulu tidak ditimpa
+    # (rowcount 0 berarti kalah balapan; NIM yang sudah dialokasikan dibiarkan menjadi celah)
+    return (
+        update(models.CalonMahasiswa)
+        .where(models.CalonMahasiswa.id == calon_id, models.CalonMahasiswa.status != models.StatusEnum.approved)
+        .values(nim=nim, status=models.StatusEnum.approved, approved_at=approved_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def approve_calon_batch(db: Session, batch_in: schemas.BatchApproveIn, nim_batch_callable):
+    query = select(models.CalonMahasiswa)
+    if batch_in.ids is not None:
+        query = query.where(models.CalonMahasiswa.id.in_(batch_in.ids))
+    else:
+        query = query.where(models.CalonMahasiswa.status == batch_in.status)
+    if batch_in.program_studi_id is not None:
+        query = query.where(models.CalonMahasiswa.program_studi_id == batch_in.program_studi_id)
+    if batch_in.jalur_masuk_id is not None:
+        query = query.where(models.CalonMahasiswa.jalur_masuk_id == batch_in.jalur_masuk_id)
+    calons = db.scalars(query.order_by(models.CalonMahasiswa.id)).all()
+
+    found_ids = {calon.id for calon in calons}
+    not_found = sorted(set(batch_in.ids) - found_ids) if batch_in.ids is not None else []
+    already_approved = [calon.id for calon in calons if calon.status == models.StatusEnum.approved]
+    by_prodi = {}
+    for calon in calons:
+        if calon.status != models.StatusEnum.approved:
+            by_prodi.setdefault(reference_cache.prodi_kode(calon.program_studi_id), []).append(calon)
+
+    now = datetime.now()
+    approved = []
+    transitions = Counter()
+    for kode_prodi, group in by_prodi.items():
+        nims = nim_batch_callable(db, tahun=now.year, kode_prodi=kode_prodi, count=len(group))
+        for calon, nim in zip(group, nims):
+            if db.execute(conditional_approve(calon.id, nim, now)).rowcount:
+                transitions[(calon.program_studi_id, calon.jalur_masuk_id, calon.status)] += 1
+                approved.append(calon.id)
+            else:
+                already_approved.append(calon.id)
+    db.commit()
+    for calon_id in approved:
+        cache.calon_cache.invalidate(calon_id)
+    for (prodi, jalur, old_status), n in transitions.items():
+        admission_stats.record_status_change(prodi, jalur, old_status, models.StatusEnum.approved, n)
+    return schemas.BatchApproveOut(approved=sorted(approved), already_approved=sorted(already_approved), not_found=not_found)
+
+LIST_YIELD_PER = 500
+
+def list_calon(db: Session, status=None, program_studi_id=None, jalur_masuk_id=None,
+               created_from=None, created_to=None, q=None, cursor=None, limit=100):
+    query = select(models.CalonMahasiswa)
+    if status is not None:
+        query = query.where(models.CalonMahasiswa.status == status)
+    if program_studi_id is not None:
+        query = query.where(models.CalonMahasiswa.program_studi_id == program_studi_id)
+    if jalur_masuk_id is not None:
+        query = query.where(models.CalonMahasiswa.jalur_masuk_id == jalur_masuk_id)
+    if created_from is not None:
+        query = query.where(models.CalonMahasiswa.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(models.CalonMahasiswa.created_at < created_to)
+    if q:
+        upper = q + "\uffff"
+        query = query.where(or_(
+            and_(models.CalonMahasiswa.nama_lengkap >= q, models.CalonMahasiswa.nama_lengkap < upper),
+            and_(models.CalonMahasiswa.email >= q, models.CalonMahasiswa.email < upper),
+        ))
+    if cursor is not None:
+        query = query.where(models.CalonMahasiswa.id > cursor)
+    query = query.order_by(models.CalonMahasiswa.id).limit(limit)
+    return db.scalars(query.execution_options(yield_per=LIST_YIELD_PER))
+
+def upsert_skor(db: Session, skor_in):
+    calon_ids = {s.calon_id for s in skor_in}
+    komponen = {s.komponen for s in skor_in}
+    db.execute(delete(models.SkorSeleksi).where(
+        models.SkorSeleksi.calon_id.in_(calon_ids), models.SkorSeleksi.komponen.in_(komponen)
+    ))
+    latest = {(s.calon_id, s.komponen): s.nilai for s in skor_in}
+    if latest:
+        db.execute(insert(models.SkorSeleksi), [
+            {"calon_id": calon_id, "komponen": k, "nilai": nilai} for (calon_id, k), nilai in latest.items()
+        ])
+    db.commit()
+    return len(latest)
+
+def scored_applicants(db: Session, weights):
+    weight = case(weights, value=models.SkorSeleksi.komponen, else_=0.0)
+    query = (
+        select(
+            models.CalonMahasiswa.id,
+            models.CalonMahasiswa.program_studi_id,
+            models.CalonMahasiswa.jalur_masuk_id,
+            func.sum(models.SkorSeleksi.nilai * weight),
+        )
+        .join(models.SkorSeleksi, models.SkorSeleksi.calon_id == models.CalonMahasiswa.id)
+        .where(models.CalonMahasiswa.status == models.StatusEnum.pending, models.SkorSeleksi.komponen.in_(weights))
+        .group_by(models.CalonMahasiswa.id)
+    )
+    return db.execute(query.execution_options(yield_per=LIST_YIELD_PER))
+
+def count_approved_by_group(db: Session):
+    query = (
+        select(models.CalonMahasiswa.program_studi_id, models.CalonMahasiswa.jalur_masuk_id, func.count())
+        .where(models.CalonMahasiswa.status == models.StatusEnum.approved)
+        .group_by(models.CalonMahasiswa.program_studi_id, models.CalonMahasiswa.jalur_masuk_id)
+    )
+    return {(prodi, jalur): n for prodi, jalur, n in db.execute(query)}
+
+EXPORT_COLUMNS = (
+    models.CalonMahasiswa.id,
+    models.CalonMahasiswa.nim,
+    models.CalonMahasiswa.nama_lengkap,
+    models.CalonMahasiswa.email,
+    models.CalonMahasiswa.phone,
+    models.CalonMahasiswa.tanggal_lahir,
+    models.CalonMahasiswa.alamat,
+    models.ProgramStudi.kode.label("kode_prodi"),
+    models.ProgramStudi.nama.label("program_studi"),
+    models.ProgramStudi.fakultas,
+    models.JalurMasuk.nama.label("jalur_masuk"),
+    models.CalonMahasiswa.approved_at,
+)
+
+def export_approved(db: Session, since=None):
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(models.ProgramStudi, models.ProgramStudi.id == models.CalonMahasiswa.program_studi_id)
+        .join(models.JalurMasuk, models.JalurMasuk.id == models.CalonMahasiswa.jalur_masuk_id)
+        .where(models.CalonMahasiswa.status == models.StatusEnum.approved)
+    )
+    if since is not None:
+        query = query.where(models.CalonMahasiswa.approved_at >= since)
+    query = query.order_by(models.CalonMahasiswa.approved_at, models.CalonMahasiswa.id)
+    return db.execute(query.execution_options(stream_results=True, yield_per=LIST_YIELD_PER))
+
+def add_dokumen(db: Session, calon_id: int, jenis: str, filename: str, content_type, sha256: str, size: int):
+    dokumen = db.scalar(select(models.DokumenCalon).where(
+        models.DokumenCalon.calon_id == calon_id,
+        models.DokumenCalon.jenis == jenis,
+        models.DokumenCalon.sha256 == sha256,
+    ))
+    if dokumen:
+        return dokumen, False
+    dokumen = models.DokumenCalon(calon_id=calon_id, jenis=jenis, filename=filename, content_type=content_type, sha256=sha256, size=size)
+    db.add(dokumen)
+    db.commit()
+    db.refresh(dokumen)
+    return dokumen, True
+
+def list_dokumen(db: Session, calon_id: int):
+    return db.scalars(select(models.DokumenCalon).where(models.DokumenCalon.calon_id == calon_id).order_by(models.DokumenCalon.id)).all()
+
+def get_dokumen(db: Session, calon_id: int, dokumen_id: int):
+    return db.scalar(select(models.DokumenCalon).where(models.DokumenCalon.id == dokumen_id, models.DokumenCalon.calon_id == calon_id))
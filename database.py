@@ -1,8 +1,46 @@
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./pmb.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pmb.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+DB_MODE = os.getenv("PMB_DB_MODE", "sync")
+ASYNC_MODE = DB_MODE == "async"
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _connect_args(url):
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+def _async_url(url):
+    # Driver async untuk database yang sama dengan DATABASE_URL
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"Tidak ada driver async bawaan untuk {backend}, isi ASYNC_DATABASE_URL")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def _same_database(a, b):
+    a, b = make_url(a), make_url(b)
+    return (a.get_backend_name(), a.host, a.port, a.database) == (b.get_backend_name(), b.host, b.port, b.database)
+
+def _resolve_async_url(url, async_url=None):
+    # Route async dan sync (bulk, ranking, cache referensi, statistik) harus membaca database yang sama
+    if async_url is None:
+        return _async_url(url)
+    if not _same_database(url, async_url):
+        raise RuntimeError("ASYNC_DATABASE_URL dan DATABASE_URL menunjuk database yang berbeda")
+    return async_url
+
+engine = create_engine(DATABASE_URL, connect_args=_connect_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    ASYNC_DATABASE_URL = _resolve_async_url(DATABASE_URL, ASYNC_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=_connect_args(ASYNC_DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
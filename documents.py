@@ -0,0 +1,83 @@
+import hashlib
+import os
+import re
+import tempfile
+from urllib.parse import quote
+
+CHUNK_SIZE = 1024 * 1024
+RANGE_REGEX = re.compile(r"^bytes=(\d*)-(\d*)$")
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\x20-\x7e]|["\\]')
+
+class DocumentStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def save(self, fileobj, chunk_size: int = CHUNK_SIZE):
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = fileobj.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+            if os.path.exists(target):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return sha256, size
+
+    def iter_range(self, sha256: str, start: int, end: int, chunk_size: int = CHUNK_SIZE):
+        with open(self.path(sha256), "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+def content_disposition(filename: str) -> str:
+    fallback = UNSAFE_FILENAME_CHARS.sub("_", filename) or "download"
+    return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename, safe="")}'
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+def parse_range(header: str, size: int):
+    # Hanya satu rentang bytes yang didukung. Bentuk lain (multi-range, unit lain, sintaks rusak)
+    # mengembalikan None sehingga header diabaikan dan isi penuh dikirim (RFC 7233 3.1);
+    # 416 hanya untuk satu rentang valid yang tidak bisa dipenuhi.
+    match = RANGE_REGEX.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    start, end = match.group(1), match.group(2)
+    if not start:
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+    start, end = int(start), int(end) if end else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+document_store = DocumentStore(os.getenv("DOCUMENT_STORAGE_DIR", "./documents"))
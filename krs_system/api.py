@@ -1,99 +1,325 @@
+import os
 from flask import Flask, request, jsonify
-from models import Course, Student, KRS
-from validators import SKSValidator, PrerequisiteValidator, ConflictValidator, DuplicateValidator
-from state_machine import KRSStateMachine, KRSStatus
+from validators import build_validator_chain
+from state_machine import KRSStateMachine, KRSStatus, InvalidTransitionError
+from repository import KRSRepository, ConcurrentUpdateError
+from catalog import CourseCatalog, CatalogError
+from seats import SeatManager, WAITLISTED
+import planner
+from logging_config import configure_logging
+import batch_validate
 
 app = Flask(__name__)
+configure_logging()
 
-# --- Simulasi data awal ---
-student = Student(nim="12345", lulus=["Matematika Dasar"])
-krs = KRS(student)
-machine = KRSStateMachine()
+# --- Penyimpanan KRS per mahasiswa ---
+repo = KRSRepository(os.getenv("KRS_DB_PATH", "krs.db"), cache_size=int(os.getenv("KRS_CACHE_SIZE", "1000")))
+
+# --- Kuota kursi per kelas dan daftar tunggu (berbagi database dengan KRS) ---
+seats = SeatManager(repo.path)
+
+# --- Katalog mata kuliah (dimuat sekali, bisa dimuat ulang lewat /catalog/reload) ---
+catalog = CourseCatalog(os.getenv("KRS_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")))
 
 # --- Chain of Responsibility setup ---
-sks_validator = SKSValidator()
-prereq_validator = sks_validator.set_next(PrerequisiteValidator())
-conflict_validator = prereq_validator.set_next(ConflictValidator())
-duplicate_validator = conflict_validator.set_next(DuplicateValidator())
+sks_validator = build_validator_chain(catalog)
 
 
 # --- Helper: validasi sebelum simpan ---
-def validate_krs():
+def validate_krs(krs):
     return sks_validator.handle(krs)
 
 
-@app.route("/krs", methods=["GET"])
-def get_krs():
+def save_krs(krs, message, events=(), **extra):
+    try:
+        repo.save(krs, events)
+    except ConcurrentUpdateError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+    return jsonify({"success": True, "message": message, **extra})
+
+
+def transition_krs(nim, new_state):
+    actor = (request.get_json(silent=True) or {}).get("actor")
+    with repo.lock(nim):
+        krs = repo.get(nim)
+        if krs is None:
+            return jsonify({"success": False, "message": f"KRS {nim} tidak ditemukan"}), 404
+        if new_state == KRSStatus.SUBMITTED:
+            validation = validate_krs(krs)
+            if not validation.success:
+                return jsonify({"success": False, "message": validation.message, "details": validation.details}), 400
+        machine = KRSStateMachine(krs.status, nim)
+        try:
+            event = machine.transition(new_state, actor)
+        except InvalidTransitionError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        krs.status = machine.state
+        return save_krs(krs, f"Status KRS: {machine.state.name}", [event], status=machine.state.name)
+
+
+def release_seat(kode, kelas, nim):
+    # Kursi yang dilepas dipindahkan ke antrean teratas; bila KRS mahasiswa tersebut
+    # tidak lagi bisa menerima kelas ini, kursinya dilepas lagi ke antrean berikutnya
+    while True:
+        nim = seats.release(kode, kelas, nim)
+        if nim is None:
+            return None
+        with repo.lock(nim):
+            krs = repo.get_or_create(nim)
+            try:
+                course = catalog.course_for(kode, kelas)
+            except KeyError:
+                continue
+            if not krs.has_course(course.nama) and sks_validator.handle_add(krs, course).success:
+                krs.add_course(course)
+                try:
+                    repo.save(krs)
+                    return nim
+                except ConcurrentUpdateError:
+                    pass
+
+
+@app.route("/krs/<nim>", methods=["GET"])
+def get_krs(nim):
+    krs = repo.get_or_create(nim)
     data = {
         "nim": krs.student.nim,
-        "status": machine.state.name,
-        "courses": [{"nama": c.nama, "sks": c.sks, "jadwal": c.jadwal, "prasyarat": c.prasyarat} for c in krs.courses],
-        "total_sks": krs.total_sks()
+        "status": krs.status.name,
+        "courses": [
+            {"kode": c.kode, "kelas": c.kelas, "nama": c.nama, "sks": c.sks, "jadwal": c.jadwal, "prasyarat": c.prasyarat}
+            for c in krs.courses
+        ],
+        "total_sks": krs.total_sks(),
+        "version": krs.version
     }
     return jsonify(data)
 
 
-@app.route("/krs/add", methods=["POST"])
-def add_course():
+@app.route("/krs/<nim>/lulus", methods=["PUT"])
+def set_lulus(nim):
     data = request.get_json()
-    nama = data.get("nama")
-    sks = data.get("sks")
-    jadwal = data.get("jadwal")
-    prasyarat = data.get("prasyarat")
+    with repo.lock(nim):
+        krs = repo.get_or_create(nim)
+        krs.student.lulus = list(data.get("lulus", []))
+        return save_krs(krs, "Daftar mata kuliah lulus diperbarui")
 
-    course = Course(nama, sks, jadwal, prasyarat)
-    krs.courses.append(course)
 
-    validation = validate_krs()
-    if not validation.success:
-        krs.courses.pop()
-        return jsonify({"success": False, "message": validation.message}), 400
+@app.route("/krs/<nim>/add", methods=["POST"])
+def add_course(nim):
+    data = request.get_json()
+    kode = data.get("kode")
+    kelas = data.get("kelas")
+
+    try:
+        course = catalog.course_for(kode, kelas)
+    except KeyError as e:
+        return jsonify({"success": False, "message": e.args[0]}), 404
+
+    with repo.lock(nim):
+        krs = repo.get_or_create(nim)
+
+        validation = sks_validator.handle_add(krs, course)
+        if not validation.success:
+            return jsonify({"success": False, "message": validation.message, "details": validation.details}), 400
 
-    return jsonify({"success": True, "message": "Mata kuliah berhasil ditambahkan"})
+        capacity = catalog.capacity(course.kode, course.kelas)
+        if capacity is not None:
+            state, position = seats.reserve(course.kode, course.kelas, nim, capacity)
+            if state == WAITLISTED:
+                return jsonify({
+                    "success": False,
+                    "message": f"Kelas {course.kode}-{course.kelas} penuh, masuk daftar tunggu",
+                    "waitlist_position": position,
+                }), 202
 
+        krs.add_course(course)
+        try:
+            repo.save(krs)
+        except ConcurrentUpdateError as e:
+            error = e
+        else:
+            return jsonify({"success": True, "message": "Mata kuliah berhasil ditambahkan"})
 
-@app.route("/krs/remove", methods=["DELETE"])
-def remove_course():
+    if capacity is not None:
+        release_seat(course.kode, course.kelas, nim)
+    return jsonify({"success": False, "message": str(error)}), 409
+
+
+@app.route("/krs/<nim>/remove", methods=["DELETE"])
+def remove_course(nim):
     data = request.get_json()
     nama = data.get("nama")
+    if nama is None and data.get("kode") in catalog:
+        nama = catalog.get(data["kode"]).nama
+
+    with repo.lock(nim):
+        krs = repo.get(nim)
+        if krs is None or not krs.has_course(nama):
+            return jsonify({"success": False, "message": f"{nama} tidak ditemukan dalam KRS"}), 404
+
+        course = krs.remove_course(nama)
+        validation = sks_validator.handle_remove(krs, course)
+        if not validation.success:
+            krs.add_course(course)
+            return jsonify({"success": False, "message": validation.message}), 400
+        try:
+            repo.save(krs)
+        except ConcurrentUpdateError as e:
+            return jsonify({"success": False, "message": str(e)}), 409
+
+    # Promosi antrean dilakukan setelah kunci NIM ini dilepas agar tidak saling mengunci
+    promoted = release_seat(course.kode, course.kelas, nim) if course.kode else None
+    return jsonify({"success": True, "message": f"{nama} berhasil dihapus dari KRS", "promoted": promoted})
 
-    before = len(krs.courses)
-    krs.courses = [c for c in krs.courses if c.nama != nama]
-    after = len(krs.courses)
 
-    if before == after:
-        return jsonify({"success": False, "message": f"{nama} tidak ditemukan dalam KRS"}), 404
-    return jsonify({"success": True, "message": f"{nama} berhasil dihapus dari KRS"})
+@app.route("/krs/<nim>/plan", methods=["POST"])
+def plan_krs(nim):
+    data = request.get_json(silent=True) or {}
+    wishes = data.get("wishes", [])
+    if not all(isinstance(w, dict) and "kode" in w for w in wishes):
+        return jsonify({"success": False, "message": "Setiap keinginan harus memiliki kode"}), 400
+    for wish in wishes:
+        error = planner.wish_error(catalog, wish)
+        if error:
+            return jsonify({"success": False, "message": error}), 400
 
+    krs = repo.get_or_create(nim)
+    # Kelas yang sudah penuh tidak ditawarkan
+    unavailable = set()
+    for wish in wishes:
+        course = catalog.get(wish["kode"])
+        for kelas in (course.sections if course else ()):
+            capacity = catalog.capacity(course.kode, kelas)
+            if capacity is not None and seats.status(course.kode, kelas)["terisi"] >= capacity:
+                unavailable.add((course.kode, kelas))
 
-@app.route("/krs/submit", methods=["POST"])
-def submit_krs():
-    validation = validate_krs()
-    if not validation.success:
-        return jsonify({"success": False, "message": validation.message}), 400
+    result = planner.plan(catalog, krs, wishes, unavailable=unavailable)
+    return jsonify({
+        "success": True,
+        "score": result.score,
+        "total_sks": krs.total_sks() + result.total_sks(),
+        "courses": [
+            {"kode": c.kode, "kelas": c.kelas, "nama": c.nama, "sks": c.sks, "jadwal": c.jadwal}
+            for c in result.courses
+        ],
+        "excluded": result.excluded,
+        "optimal": result.optimal,
+        "nodes": result.nodes,
+        "duration_ms": result.duration_ms,
+    })
+
+
+@app.route("/krs/<nim>/waitlist", methods=["DELETE"])
+def leave_waitlist(nim):
+    data = request.get_json()
+    if not seats.leave_waitlist(data.get("kode"), data.get("kelas"), nim):
+        return jsonify({"success": False, "message": f"{nim} tidak ada di daftar tunggu"}), 404
+    return jsonify({"success": True, "message": "Keluar dari daftar tunggu"})
+
+
+@app.route("/sections/<kode>/<kelas>", methods=["GET"])
+def section_status(kode, kelas):
+    status = seats.status(kode, kelas)
+    if status["kapasitas"] is None:
+        status["kapasitas"] = catalog.capacity(kode, kelas)
+    return jsonify(status)
+
+
+@app.route("/krs/<nim>/submit", methods=["POST"])
+def submit_krs(nim):
+    return transition_krs(nim, KRSStatus.SUBMITTED)
+
+
+@app.route("/krs/<nim>/revision", methods=["POST"])
+def revise_krs(nim):
+    return transition_krs(nim, KRSStatus.REVISION)
+
+
+@app.route("/krs/<nim>/approve", methods=["POST"])
+def approve_krs(nim):
+    return transition_krs(nim, KRSStatus.APPROVED)
+
+
+@app.route("/krs/<nim>/history", methods=["GET"])
+def krs_history(nim):
+    events = repo.history(nim)
+    if not events and repo.get(nim) is None:
+        return jsonify({"success": False, "message": f"KRS {nim} tidak ditemukan"}), 404
+    return jsonify({
+        "nim": nim,
+        "status": repo.rebuild_status(nim).name,
+        "events": [{"seq": seq, **event.to_dict()} for seq, event in events],
+    })
+
+
+@app.route("/krs/transition", methods=["POST"])
+def bulk_transition():
+    # Transisi massal oleh dosen wali: semua KRS yang valid disimpan dalam satu transaksi
+    data = request.get_json(silent=True) or {}
     try:
-        machine.transition(KRSStatus.SUBMITTED)
-        return jsonify({"success": True, "status": machine.state.name})
-    except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 400
+        new_state = KRSStatus[data.get("to", "")]
+    except KeyError:
+        return jsonify({"success": False, "message": f"Status tidak dikenal: {data.get('to')}"}), 400
+    if new_state == KRSStatus.SUBMITTED:
+        return jsonify({"success": False, "message": "Pengajuan KRS dilakukan oleh mahasiswa sendiri"}), 400
+    nims = list(dict.fromkeys(data.get("nims", [])))
+    actor = data.get("actor")
 
+    with repo.lock_many(nims):
+        found = {krs.student.nim: krs for krs in repo.load_many(nims)}
+        items, invalid = [], []
+        for nim in nims:
+            krs = found.get(nim)
+            if krs is None:
+                continue
+            machine = KRSStateMachine(krs.status, nim)
+            try:
+                event = machine.transition(new_state, actor)
+            except InvalidTransitionError as e:
+                invalid.append({"nim": nim, "message": str(e)})
+                continue
+            krs.status = machine.state
+            items.append((krs, [event]))
+        try:
+            repo.save_many(items)
+        except ConcurrentUpdateError as e:
+            return jsonify({"success": False, "message": str(e)}), 409
 
-@app.route("/krs/revision", methods=["POST"])
-def revise_krs():
+    return jsonify({
+        "success": not invalid and len(items) == len(nims),
+        "status": new_state.name,
+        "transitioned": [krs.student.nim for krs, _ in items],
+        "invalid": invalid,
+        "not_found": [nim for nim in nims if nim not in found],
+    })
+
+
+@app.route("/krs/validate-all", methods=["POST"])
+def validate_all_krs():
+    data = request.get_json(silent=True) or {}
     try:
-        machine.transition(KRSStatus.REVISION)
-        return jsonify({"success": True, "status": machine.state.name})
-    except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 400
+        statuses = [KRSStatus[name] for name in data.get("status", ["SUBMITTED"])]
+    except KeyError as e:
+        return jsonify({"success": False, "message": f"Status tidak dikenal: {e.args[0]}"}), 400
+    workers = data.get("workers")
+    if workers is not None and (isinstance(workers, bool) or not isinstance(workers, int) or workers < 1):
+        return jsonify({"success": False, "message": "workers harus berupa bilangan bulat positif"}), 400
+    report = batch_validate.validate_all(repo.path, catalog.path, statuses, workers)
+    return jsonify({"success": report["failed"] == 0, **report})
+
+
+@app.route("/catalog", methods=["GET"])
+def get_catalog():
+    return jsonify(catalog.to_dict())
 
 
-@app.route("/krs/approve", methods=["POST"])
-def approve_krs():
+@app.route("/catalog/reload", methods=["POST"])
+def reload_catalog():
     try:
-        machine.transition(KRSStatus.APPROVED)
-        return jsonify({"success": True, "status": machine.state.name})
-    except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 400
+        catalog.reload()
+    except (OSError, ValueError, KeyError, CatalogError) as e:
+        return jsonify({"success": False, "message": f"Katalog gagal dimuat: {e}"}), 400
+    return jsonify({"success": True, "version": catalog.version, "total": len(catalog)})
 
 
 if __name__ == "__main__":
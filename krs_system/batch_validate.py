@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from catalog import CourseCatalog
+from repository import KRSRepository
+from state_machine import KRSStatus
+from validators import build_validator_chain
+
+SHARD_SIZE = 500
+
+# --- State per proses worker, dimuat sekali lewat initializer ---
+_worker = {}
+
+
+def _init_worker(db_path, catalog_path):
+    catalog = CourseCatalog(catalog_path)
+    _worker["repo"] = KRSRepository(db_path, cache_size=0)
+    _worker["chain"] = build_validator_chain(catalog)
+
+
+def _validate_shard(nims):
+    failures = []
+    for krs in _worker["repo"].load_many(nims):
+        for rule, result in _worker["chain"].collect_errors(krs):
+            failures.append((krs.student.nim, rule, result.message))
+    return len(nims), failures
+
+
+def validate_all(db_path, catalog_path, statuses=(KRSStatus.SUBMITTED,), workers=None, shard_size=SHARD_SIZE):
+    started = time.perf_counter()
+    nims = KRSRepository(db_path, cache_size=0).list_nims(statuses)
+    shards = [nims[i:i + shard_size] for i in range(0, len(nims), shard_size)]
+
+    checked = 0
+    by_rule = {}
+    failed_nims = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path, catalog_path)) as pool:
+        for count, failures in pool.map(_validate_shard, shards):
+            checked += count
+            for nim, rule, message in failures:
+                failed_nims.add(nim)
+                entry = by_rule.setdefault(rule, {"count": 0, "students": []})
+                entry["count"] += 1
+                entry["students"].append({"nim": nim, "message": message})
+
+    return {
+        "checked": checked,
+        "failed": len(failed_nims),
+        "by_rule": by_rule,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validasi ulang seluruh KRS terhadap katalog terbaru")
+    parser.add_argument("--db", default=os.getenv("KRS_DB_PATH", "krs.db"))
+    parser.add_argument("--catalog", default=os.getenv("KRS_CATALOG_PATH", "catalog.json"))
+    parser.add_argument("--status", nargs="*", default=["SUBMITTED"], choices=[s.name for s in KRSStatus])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="krs_validation_report.json")
+    args = parser.parse_args()
+
+    report = validate_all(args.db, args.catalog, [KRSStatus[s] for s in args.status], args.workers)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, separators=(",", ":"))
+    print(f"{report['checked']} KRS diperiksa, {report['failed']} gagal ({report['duration_seconds']} detik)")
+    for rule, entry in report["by_rule"].items():
+        print(f"  {rule}: {entry['count']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import gc
+import json
+import os
+import tracemalloc
+from catalog import CourseCatalog
+from models import KRS, Course, Student
+
+# --- Benchmark memori: representasi KRS lama (objek __dict__ per mahasiswa) vs. id mata kuliah ter-intern ---
+COURSES_PER_STUDENT = 8
+
+
+# Salinan apa adanya dari models.py versi awal (sebelum ada slot, indeks agregat, atau intern)
+class LegacyCourse:
+    def __init__(self, nama, sks, jadwal, prasyarat=None):
+        self.nama = nama
+        self.sks = sks
+        self.jadwal = jadwal
+        self.prasyarat = prasyarat
+
+
+class LegacyStudent:
+    def __init__(self, nim, lulus=None):
+        self.nim = nim
+        self.lulus = lulus or []
+
+
+class LegacyKRS:
+    def __init__(self, student, courses=None):
+        self.student = student
+        self.courses = courses or []
+
+    def total_sks(self):
+        return sum(course.sks for course in self.courses)
+
+
+def _payloads(catalog, students):
+    # Baris seperti yang dibaca dari database: setiap mahasiswa punya salinan JSON sendiri
+    sections = [(c["kode"], kelas) for c in catalog.to_dict()["courses"] for kelas in c["sections"]]
+    rows = []
+    for n in range(students):
+        picked = [sections[(n + k * 3) % len(sections)] for k in range(COURSES_PER_STUDENT)]
+        courses = []
+        for kode, kelas in picked:
+            course = catalog.course_for(kode, kelas)
+            courses.append({
+                "nama": course.nama, "sks": course.sks, "jadwal": course.jadwal,
+                "prasyarat": list(course.prasyarat), "kode": kode, "kelas": kelas,
+            })
+        rows.append((f"{n:08d}", json.dumps(["Matematika Dasar", "Algoritma"]), json.dumps(courses)))
+    return rows
+
+
+def _measure(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(*row) for row in rows]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def _legacy(nim, lulus, courses):
+    # Versi awal tidak mengenal kode/kelas, jadi kolom itu tidak ikut disimpan
+    return LegacyKRS(
+        LegacyStudent(nim, json.loads(lulus)),
+        [LegacyCourse(c["nama"], c["sks"], c["jadwal"], c["prasyarat"]) for c in json.loads(courses)],
+    )
+
+
+def _compact(nim, lulus, courses):
+    return KRS(Student(nim, json.loads(lulus)), [Course(**c) for c in json.loads(courses)])
+
+
+def run(students=30000, catalog_path=None):
+    catalog = CourseCatalog(catalog_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json"))
+    rows = _payloads(catalog, students)
+    _compact(*rows[0])  # registri intern diisi dulu agar tidak ikut terukur
+    legacy = _measure(_legacy, rows)
+    compact = _measure(_compact, rows)
+    return {
+        "students": students,
+        "courses_per_student": COURSES_PER_STUDENT,
+        "legacy_bytes": legacy,
+        "compact_bytes": compact,
+        "legacy_bytes_per_student": round(legacy / students),
+        "compact_bytes_per_student": round(compact / students),
+        "reduction": round(1 - compact / legacy, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan memori representasi KRS lama dan ringkas")
+    parser.add_argument("--students", type=int, default=30000)
+    parser.add_argument("--catalog", default=os.getenv("KRS_CATALOG_PATH"))
+    args = parser.parse_args()
+    print(json.dumps(run(args.students, args.catalog), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import json
+import threading
+from models import Course
+
+
+class CatalogError(Exception):
+    pass
+
+
+class CatalogCourse:
+    def __init__(self, kode, nama, sks, prasyarat=None, sections=None, kapasitas=None):
+        self.kode = kode
+        self.nama = nama
+        self.sks = sks
+        self.prasyarat = list(prasyarat or [])
+        self.sections = dict(sections or {})
+        # Kapasitas boleh satu angka untuk semua kelas atau dict per kelas; None berarti tidak dibatasi
+        self.kapasitas = kapasitas
+
+    def capacity(self, kelas):
+        if isinstance(self.kapasitas, dict):
+            return self.kapasitas.get(kelas)
+        return self.kapasitas
+
+
+class _CatalogState:
+    def __init__(self, courses, version=0):
+        self.courses = courses
+        self.version = version
+        self.by_nama = {c.nama: c.kode for c in courses.values()}
+        order = _topological_order(courses)
+        self.kodes = order
+        self.bit = {kode: 1 << i for i, kode in enumerate(order)}
+        self.prereq_mask = {}
+        self.closure_mask = {}
+        # Urutan topologis menjamin closure prasyarat sudah dihitung lebih dulu
+        for kode in order:
+            direct = 0
+            closure = 0
+            for prasyarat in courses[kode].prasyarat:
+                direct |= self.bit[prasyarat]
+                closure |= self.bit[prasyarat] | self.closure_mask[prasyarat]
+            self.prereq_mask[kode] = direct
+            self.closure_mask[kode] = closure
+
+    def resolve(self, kode_or_nama):
+        if kode_or_nama in self.courses:
+            return kode_or_nama
+        return self.by_nama.get(kode_or_nama)
+
+    def names(self, mask):
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self.courses[self.kodes[low.bit_length() - 1]].nama)
+            mask ^= low
+        return names
+
+
+def _topological_order(courses):
+    indegree = {kode: 0 for kode in courses}
+    dependents = {kode: [] for kode in courses}
+    for course in courses.values():
+        for prasyarat in course.prasyarat:
+            if prasyarat not in courses:
+                raise CatalogError(f"Prasyarat {prasyarat} untuk {course.kode} tidak ada di katalog")
+            indegree[course.kode] += 1
+            dependents[prasyarat].append(course.kode)
+    ready = [kode for kode, n in indegree.items() if n == 0]
+    order = []
+    while ready:
+        kode = ready.pop()
+        order.append(kode)
+        for dependent in dependents[kode]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                ready.append(dependent)
+    if len(order) != len(courses):
+        cyclic = sorted(kode for kode, n in indegree.items() if n > 0)
+        raise CatalogError(f"Prasyarat membentuk siklus: {', '.join(cyclic)}")
+    return order
+
+
+class CourseCatalog:
+    def __init__(self, path=None):
+        self.path = path
+        self._state = _CatalogState({})
+        self._lock = threading.Lock()
+        if path:
+            self.reload()
+
+    def load(self, entries):
+        courses = {}
+        for entry in entries:
+            course = CatalogCourse(
+                entry["kode"], entry["nama"], entry["sks"], entry.get("prasyarat"), entry.get("sections"),
+                entry.get("kapasitas"),
+            )
+            if course.kode in courses:
+                raise CatalogError(f"Kode {course.kode} duplikat di katalog")
+            courses[course.kode] = course
+        with self._lock:
+            self._state = _CatalogState(courses, self._state.version + 1)
+
+    @property
+    def version(self):
+        return self._state.version
+
+    def reload(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.load(data["courses"] if isinstance(data, dict) else data)
+
+    def get(self, kode):
+        return self._state.courses.get(kode)
+
+    def __contains__(self, kode):
+        return kode in self._state.courses
+
+    def __len__(self):
+        return len(self._state.courses)
+
+    def course_for(self, kode, kelas=None):
+        course = self.get(kode)
+        if course is None:
+            raise KeyError(f"Mata kuliah {kode} tidak ada di katalog")
+        if kelas is None and course.sections:
+            kelas = next(iter(course.sections))
+        if course.sections and kelas not in course.sections:
+            raise KeyError(f"Kelas {kelas} tidak tersedia untuk {kode}")
+        prasyarat = [self._state.courses[p].nama for p in course.prasyarat]
+        return Course(course.nama, course.sks, course.sections.get(kelas), prasyarat, kode=kode, kelas=kelas)
+
+    def capacity(self, kode, kelas):
+        course = self.get(kode)
+        return course.capacity(kelas) if course is not None else None
+
+    def passed_mask(self, student):
+        state = self._state
+        cached = student.catalog_mask
+        if cached is not None and cached[0] == state.version:
+            return cached[1]
+        mask = 0
+        for item in student.lulus:
+            kode = state.resolve(item)
+            if kode is not None:
+                # Lulus suatu mata kuliah berarti seluruh rantai prasyaratnya juga terpenuhi
+                mask |= state.bit[kode] | state.closure_mask[kode]
+        student.catalog_mask = (state.version, mask)
+        return mask
+
+    def missing_prerequisites(self, kode, passed_mask):
+        state = self._state
+        return state.names(state.prereq_mask[kode] & ~passed_mask)
+
+    def closure(self, kode):
+        state = self._state
+        return state.names(state.closure_mask[kode])
+
+    def to_dict(self):
+        state = self._state
+        return {
+            "version": state.version,
+            "courses": [
+                {
+                    "kode": c.kode, "nama": c.nama, "sks": c.sks, "prasyarat": c.prasyarat,
+                    "sections": c.sections, "kapasitas": c.kapasitas,
+                }
+                for c in state.courses.values()
+            ],
+        }
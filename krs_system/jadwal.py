@@ -0,0 +1,77 @@
+import re
+from collections import defaultdict
+
+HARI = {
+    "senin": 0, "selasa": 1, "rabu": 2, "kamis": 3, "jumat": 4, "jum'at": 4, "sabtu": 5, "minggu": 6,
+}
+MENIT_PER_SKS = 50
+SLOT_REGEX = re.compile(r"([A-Za-z']+)\s+(\d{1,2})[:.](\d{2})(?:\s*-\s*(\d{1,2})[:.](\d{2}))?")
+
+
+class TimeSlot:
+    __slots__ = ("hari", "mulai", "selesai")
+
+    def __init__(self, hari, mulai, selesai):
+        self.hari = hari
+        self.mulai = mulai
+        self.selesai = selesai
+
+    def overlaps(self, other):
+        return self.hari == other.hari and self.mulai < other.selesai and other.mulai < self.selesai
+
+    def __repr__(self):
+        return f"TimeSlot({self.hari}, {self.mulai}, {self.selesai})"
+
+
+# "Senin 08:00-10:30, Rabu 08:00-09:40" -> (TimeSlot, TimeSlot). Jam selesai yang tidak ditulis
+# dihitung dari SKS; jadwal yang tidak dikenali menghasilkan None dan dibandingkan sebagai string.
+def parse_jadwal(jadwal, sks=None):
+    if not jadwal:
+        return None
+    slots = []
+    for match in SLOT_REGEX.finditer(jadwal):
+        hari = HARI.get(match.group(1).lower())
+        if hari is None:
+            return None
+        mulai = int(match.group(2)) * 60 + int(match.group(3))
+        if match.group(4):
+            selesai = int(match.group(4)) * 60 + int(match.group(5))
+        else:
+            selesai = mulai + MENIT_PER_SKS * (sks or 1)
+        if selesai <= mulai:
+            return None
+        slots.append(TimeSlot(hari, mulai, selesai))
+    return tuple(slots) or None
+
+
+# Semua pasangan mata kuliah yang beririsan: per hari, interval diurutkan lalu di-sweep.
+def find_conflicts(courses):
+    per_hari = defaultdict(list)
+    raw = defaultdict(list)
+    for index, course in enumerate(courses):
+        slots = course.slots
+        if slots is None:
+            raw[course.jadwal].append(index)
+            continue
+        for slot in slots:
+            per_hari[slot.hari].append((slot.mulai, slot.selesai, index))
+
+    pairs = set()
+    for intervals in per_hari.values():
+        intervals.sort()
+        active = []
+        for mulai, selesai, index in intervals:
+            active = [item for item in active if item[0] > mulai]
+            for _, other in active:
+                if other != index:
+                    pairs.add((min(index, other), max(index, other)))
+            active.append((selesai, index))
+    for indexes in raw.values():
+        for i, a in enumerate(indexes):
+            for b in indexes[i + 1:]:
+                pairs.add((a, b))
+    return [(courses[a], courses[b]) for a, b in sorted(pairs)]
+
+
+def format_conflicts(pairs):
+    return "; ".join(f"{a.nama} dan {b.nama}" for a, b in pairs)
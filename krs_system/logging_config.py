@@ -0,0 +1,49 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        event = getattr(record, "event", None)
+        if event is not None:
+            payload["event"] = event
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class StderrHandler(logging.StreamHandler):
+    # Selalu menulis ke sys.stderr saat ini, supaya flush di atexit tidak memakai stream yang sudah ditutup
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def configure_logging(stream=None, level=logging.INFO):
+    # Request hanya memasukkan record ke antrean; thread listener yang menulis ke stream,
+    # jadi log tidak tertahan di buffer sampai penuh atau sampai proses berhenti
+    root = logging.getLogger("krs")
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return root
+    target = logging.StreamHandler(stream) if stream is not None else StderrHandler()
+    target.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, target)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+    root.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+    return root
@@ -1,8 +1,10 @@
 from models import Course, Student, KRS
 from validators import SKSValidator, PrerequisiteValidator, ConflictValidator, DuplicateValidator
-from state_machine import KRSStateMachine, KRSStatus
+from state_machine import KRSStateMachine, KRSStatus, log_transition
+from logging_config import configure_logging
 
 def main():
+    configure_logging()
     student = Student(nim="12345", lulus=["Matematika Dasar"])
 
     courses = [
@@ -22,13 +24,11 @@ def main():
     result = v1.handle(krs)
     print(result)
 
-    # State transitions
-    machine = KRSStateMachine()
+    # State transitions (demo tanpa repository: event langsung dicatat, tidak menunggu commit)
+    machine = KRSStateMachine(nim=student.nim)
     print(machine)
-    machine.transition(KRSStatus.SUBMITTED)
-    machine.transition(KRSStatus.REVISION)
-    machine.transition(KRSStatus.SUBMITTED)
-    machine.transition(KRSStatus.APPROVED)
+    for status in (KRSStatus.SUBMITTED, KRSStatus.REVISION, KRSStatus.SUBMITTED, KRSStatus.APPROVED):
+        log_transition(machine.transition(status))
     print(machine)
 
 if __name__ == "__main__":
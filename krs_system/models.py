@@ -1,21 +1,215 @@
+import sys
+import threading
+from array import array
+from collections import Counter, defaultdict
+from state_machine import KRSStatus
+from jadwal import parse_jadwal
+
+
+# --- Mata kuliah di-intern: satu objek immutable per kombinasi data, dipakai bersama seluruh KRS ---
+# Registri hanya bertambah; jumlah entrinya dibatasi banyaknya kelas di katalog, bukan jumlah mahasiswa.
+_registry = []
+_interned = {}
+_intern_lock = threading.Lock()
+
+
 class Course:
-    def __init__(self, nama, sks, jadwal, prasyarat=None):
-        self.nama = nama
-        self.sks = sks
-        self.jadwal = jadwal
-        self.prasyarat = prasyarat
+    __slots__ = ("id", "nama", "sks", "jadwal", "prasyarat", "kode", "kelas", "slots")
+
+    def __new__(cls, nama, sks, jadwal, prasyarat=None, kode=None, kelas=None):
+        if isinstance(prasyarat, list):
+            prasyarat = tuple(prasyarat)
+        key = (nama, sks, jadwal, prasyarat, kode, kelas)
+        course = _interned.get(key)
+        if course is not None:
+            return course
+        with _intern_lock:
+            course = _interned.get(key)
+            if course is None:
+                course = object.__new__(cls)
+                for name, value in zip(("nama", "sks", "jadwal", "prasyarat", "kode", "kelas"), key):
+                    object.__setattr__(course, name, _intern(value))
+                object.__setattr__(course, "slots", parse_jadwal(jadwal, sks))
+                object.__setattr__(course, "id", len(_registry))
+                _registry.append(course)
+                _interned[key] = course
+        return course
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Course bersifat immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Course bersifat immutable")
+
+    def __reduce__(self):
+        return Course, (self.nama, self.sks, self.jadwal, self.prasyarat, self.kode, self.kelas)
+
+    def __repr__(self):
+        return f"Course({self.kode or self.nama}, kelas={self.kelas})"
+
+    @staticmethod
+    def by_id(course_id):
+        return _registry[course_id]
+
+    def prasyarat_list(self):
+        if isinstance(self.prasyarat, tuple):
+            return list(self.prasyarat)
+        return [self.prasyarat] if self.prasyarat else []
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, tuple):
+        return tuple(_intern(v) for v in value)
+    return value
 
 
 class Student:
+    __slots__ = ("nim", "_lulus", "lulus_set", "catalog_mask")
+
     def __init__(self, nim, lulus=None):
         self.nim = nim
         self.lulus = lulus or []
 
+    @property
+    def lulus(self):
+        return self._lulus
+
+    @lulus.setter
+    def lulus(self, value):
+        self._lulus = [sys.intern(item) for item in value]
+        self.lulus_set = frozenset(self._lulus)
+        self.catalog_mask = None
+
+
+class _CourseIndex:
+    __slots__ = ("slots_by_hari", "raw_jadwal", "nama_counts")
+
+    def __init__(self):
+        self.slots_by_hari = defaultdict(list)
+        self.raw_jadwal = defaultdict(list)
+        self.nama_counts = Counter()
+
 
 class KRS:
-    def __init__(self, student, courses=None):
+    __slots__ = ("student", "_course_ids", "status", "version", "event_seq", "_total_sks", "_index")
+
+    def __init__(self, student, courses=None, status=None, version=0):
         self.student = student
         self.courses = courses or []
+        self.status = status or KRSStatus.DRAFT
+        self.version = version
+        self.event_seq = 0
+
+    # --- Mata kuliah disimpan sebagai array id; objeknya diambil dari registri intern ---
+    @property
+    def courses(self):
+        # Tuple hanya-baca: perubahan lewat add_course/remove_course atau setter, bukan append/remove
+        return tuple(_registry[i] for i in self._course_ids)
+
+    @courses.setter
+    def courses(self, value):
+        self._course_ids = array("I", (course.id for course in value))
+        self._total_sks = sum(_registry[i].sks for i in self._course_ids)
+        self._index = None
+
+    @property
+    def course_ids(self):
+        return self._course_ids
+
+    # --- Indeks jadwal/nama dibangun saat pertama dibutuhkan, lalu diperbarui berjalan ---
+    def _aggregates(self):
+        if self._index is None:
+            self._index = _CourseIndex()
+            for i in self._course_ids:
+                self._remember(_registry[i])
+        return self._index
+
+    @property
+    def slots_by_hari(self):
+        return self._aggregates().slots_by_hari
+
+    @property
+    def raw_jadwal(self):
+        return self._aggregates().raw_jadwal
+
+    @property
+    def nama_counts(self):
+        return self._aggregates().nama_counts
+
+    def add_course(self, course):
+        self._course_ids.append(course.id)
+        self._total_sks += course.sks
+        if self._index is not None:
+            self._remember(course)
+
+    def _remember(self, course):
+        index = self._index
+        if course.slots is None:
+            index.raw_jadwal[course.jadwal].append(course)
+        else:
+            for slot in course.slots:
+                index.slots_by_hari[slot.hari].append((slot, course))
+        index.nama_counts[course.nama] += 1
+
+    def remove_course(self, nama):
+        for i, course_id in enumerate(self._course_ids):
+            course = _registry[course_id]
+            if course.nama == nama:
+                del self._course_ids[i]
+                self._forget(course)
+                return course
+        return None
+
+    def pop_course(self):
+        course = _registry[self._course_ids.pop()]
+        self._forget(course)
+        return course
+
+    def _forget(self, course):
+        self._total_sks -= course.sks
+        index = self._index
+        if index is None:
+            return
+        if course.slots is None:
+            _discard(index.raw_jadwal, course.jadwal, course)
+        else:
+            # Objek mata kuliah dipakai bersama, jadi hanya satu entri per slot yang dibuang
+            for slot in course.slots:
+                entries = index.slots_by_hari[slot.hari]
+                for j, entry in enumerate(entries):
+                    if entry[1] is course:
+                        del entries[j]
+                        break
+        _decrement(index.nama_counts, course.nama)
+
+    def clashes(self, course):
+        # Hanya hari yang dipakai mata kuliah baru yang diperiksa
+        if course.slots is None:
+            return list(self.raw_jadwal.get(course.jadwal, ()))
+        clashing = []
+        for slot in course.slots:
+            for other_slot, other in self.slots_by_hari.get(slot.hari, ()):
+                if slot.overlaps(other_slot) and other not in clashing:
+                    clashing.append(other)
+        return clashing
+
+    def has_course(self, nama):
+        return nama in self.nama_counts
 
     def total_sks(self):
-        return sum(course.sks for course in self.courses)
+        return self._total_sks
+
+
+def _discard(groups, key, course):
+    entries = groups[key]
+    entries.remove(course)
+    if not entries:
+        del groups[key]
+
+
+def _decrement(counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
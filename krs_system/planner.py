@@ -0,0 +1,168 @@
+import bisect
+import math
+import time
+from validators import MAX_SKS
+
+TIME_BUDGET_MS = 50
+DEADLINE_CHECK_EVERY = 256
+
+
+class PlanResult:
+    def __init__(self, courses, score, nodes, optimal, excluded, duration_ms):
+        self.courses = courses
+        self.score = score
+        self.nodes = nodes
+        self.optimal = optimal
+        self.excluded = excluded
+        self.duration_ms = duration_ms
+
+    def total_sks(self):
+        return sum(course.sks for course in self.courses)
+
+
+def wish_error(catalog, wish):
+    # Prioritas dan SKS menjadi bobot dan pembagi batas knapsack, jadi keduanya harus angka positif
+    prioritas = wish.get("prioritas", 1)
+    if isinstance(prioritas, bool) or not isinstance(prioritas, (int, float)) or not 0 < prioritas < math.inf:
+        return f"Prioritas {wish['kode']} harus berupa angka positif"
+    kelas = wish.get("kelas")
+    if kelas is not None and (not isinstance(kelas, list) or not all(isinstance(k, str) for k in kelas)):
+        return f"Kelas {wish['kode']} harus berupa daftar kode kelas, misalnya [\"A\"]"
+    course = catalog.get(wish["kode"])
+    if course is not None and course.sks <= 0:
+        return f"SKS {wish['kode']} di katalog harus positif"
+    return None
+
+
+def _clash(a, b):
+    # Sama dengan aturan find_conflicts: interval beririsan, atau jadwal tak terbaca yang identik
+    if a.slots is None or b.slots is None:
+        return a.slots is None and b.slots is None and a.jadwal == b.jadwal
+    return any(x.overlaps(y) for x in a.slots for y in b.slots)
+
+
+# Rencana studi terbaik dari daftar keinginan: pilih paling banyak satu kelas per mata kuliah
+# sehingga total prioritas maksimal, memenuhi aturan yang sama dengan rantai validator
+# (batas SKS, prasyarat, tanpa bentrok, tanpa duplikat). Branch-and-bound dengan batas atas
+# knapsack pecahan; bentrok antarkelas disimpan sebagai bitmask. Pencarian dibatasi waktu: bila
+# time_budget_ms habis, solusi terbaik sejauh ini dikembalikan dengan optimal=False.
+def plan(catalog, krs, wishes, max_sks=MAX_SKS, unavailable=frozenset(), time_budget_ms=TIME_BUDGET_MS):
+    started = time.perf_counter()
+    passed = catalog.passed_mask(krs.student)
+    budget = max_sks - krs.total_sks()
+    excluded = []
+    candidates = []
+    seen = set()
+    for wish in wishes:
+        kode = wish["kode"]
+        if kode in seen:
+            continue
+        seen.add(kode)
+        course = catalog.get(kode)
+        if course is None:
+            excluded.append({"kode": kode, "alasan": "Tidak ada di katalog"})
+            continue
+        if krs.has_course(course.nama):
+            excluded.append({"kode": kode, "alasan": "Sudah ada di KRS"})
+            continue
+        missing = catalog.missing_prerequisites(kode, passed)
+        if missing:
+            excluded.append({"kode": kode, "alasan": f"Belum lulus prasyarat {missing[0]}"})
+            continue
+        if course.sks > budget:
+            excluded.append({"kode": kode, "alasan": "Melebihi sisa SKS"})
+            continue
+        kelas_list = wish.get("kelas") or list(course.sections) or [None]
+        sections = []
+        for kelas in kelas_list:
+            if (kode, kelas) in unavailable:
+                continue
+            try:
+                section = catalog.course_for(kode, kelas)
+            except KeyError:
+                continue
+            if not krs.clashes(section):
+                sections.append(section)
+        if not sections:
+            excluded.append({"kode": kode, "alasan": "Semua kelas bentrok atau penuh"})
+            continue
+        candidates.append((float(wish.get("prioritas", 1)), course.sks, sections))
+
+    # Urut menurut kepadatan prioritas/SKS agar batas knapsack pecahan bisa dihitung dari prefix sum
+    candidates.sort(key=lambda c: c[0] / c[1], reverse=True)
+    flat = [section for _, _, sections in candidates for section in sections]
+    owner = [i for i, (_, _, sections) in enumerate(candidates) for _ in sections]
+    conflict = [0] * len(flat)
+    for i, a in enumerate(flat):
+        for j in range(i + 1, len(flat)):
+            if owner[i] != owner[j] and _clash(a, flat[j]):
+                conflict[i] |= 1 << j
+                conflict[j] |= 1 << i
+    section_ids = []
+    start = 0
+    for _, _, sections in candidates:
+        section_ids.append(range(start, start + len(sections)))
+        start += len(sections)
+
+    n = len(candidates)
+    # Prefix sum SKS/prioritas: batas knapsack pecahan cukup satu pencarian biner per node
+    integral = all(prioritas.is_integer() for prioritas, _, _ in candidates)
+    prefix_sks = [0]
+    prefix_score = [0.0]
+    for prioritas, sks, _ in candidates:
+        prefix_sks.append(prefix_sks[-1] + sks)
+        prefix_score.append(prefix_score[-1] + prioritas)
+
+    def bound(index, score, remaining):
+        limit = prefix_sks[index] + remaining
+        j = bisect.bisect_right(prefix_sks, limit, index) - 1
+        score += prefix_score[j] - prefix_score[index]
+        if j < n:
+            score += candidates[j][0] * (limit - prefix_sks[j]) / candidates[j][1]
+        # Prioritas bulat -> skor solusi juga bulat, jadi pecahan pada batas bisa dibuang
+        return math.floor(score + 1e-9) if integral else score
+
+    # Solusi awal greedy menurut kepadatan, supaya pemangkasan langsung efektif dan selalu ada
+    # jawaban layak bila waktu habis
+    best = {"score": 0.0, "sks": 0, "chosen": []}
+    mask = 0
+    for index, (prioritas, course_sks, _) in enumerate(candidates):
+        if best["sks"] + course_sks > budget:
+            continue
+        for i in section_ids[index]:
+            if not conflict[i] & mask:
+                mask |= 1 << i
+                best["chosen"].append(i)
+                best["score"] += prioritas
+                best["sks"] += course_sks
+                break
+    deadline = started + time_budget_ms / 1000
+    nodes = 0
+    truncated = False
+
+    def search(index, score, sks, mask, chosen):
+        nonlocal nodes, truncated
+        if truncated:
+            return
+        nodes += 1
+        if nodes % DEADLINE_CHECK_EVERY == 0 and time.perf_counter() > deadline:
+            truncated = True
+            return
+        if (score, sks) > (best["score"], best["sks"]):
+            best.update(score=score, sks=sks, chosen=list(chosen))
+        if index == n:
+            return
+        if bound(index, score, budget - sks) <= best["score"]:
+            return
+        prioritas, course_sks, _ = candidates[index]
+        if sks + course_sks <= budget:
+            for i in section_ids[index]:
+                if not conflict[i] & mask:
+                    chosen.append(i)
+                    search(index + 1, score + prioritas, sks + course_sks, mask | (1 << i), chosen)
+                    chosen.pop()
+        search(index + 1, score, sks, mask, chosen)
+
+    search(0, 0.0, 0, 0, [])
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    return PlanResult([flat[i] for i in best["chosen"]], best["score"], nodes, not truncated, excluded, duration_ms)
@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from models import Course, Student, KRS
+from state_machine import KRSStateMachine, KRSStatus, TransitionEvent, log_transition
+
+
+class ConcurrentUpdateError(Exception):
+    pass
+
+
+class KRSRepository:
+    LOCK_STRIPES = 256
+    SNAPSHOT_EVERY = 20
+
+    def __init__(self, path="krs.db", cache_size=1000):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS krs (
+                nim TEXT PRIMARY KEY,
+                lulus TEXT NOT NULL,
+                courses TEXT NOT NULL,
+                status TEXT NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS krs_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nim TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                from_state TEXT NOT NULL,
+                to_state TEXT NOT NULL,
+                actor TEXT,
+                at TEXT NOT NULL,
+                UNIQUE (nim, seq)
+            );
+            CREATE TABLE IF NOT EXISTS krs_snapshots (
+                nim TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                status TEXT NOT NULL
+            );
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(krs)")}
+        if "event_seq" not in columns:
+            conn.execute("ALTER TABLE krs ADD COLUMN event_seq INTEGER NOT NULL DEFAULT 0")
+
+    def lock(self, nim):
+        return self._locks[hash(nim) % self.LOCK_STRIPES]
+
+    @contextmanager
+    def lock_many(self, nims):
+        # Kunci diambil berurutan menurut indeks stripe agar tidak terjadi deadlock
+        stripes = sorted({hash(nim) % self.LOCK_STRIPES for nim in nims})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+            yield
+
+    def get(self, nim):
+        with self._cache_lock:
+            krs = self._cache.get(nim)
+            if krs is not None:
+                self._cache.move_to_end(nim)
+                return krs
+        row = self._connection().execute(
+            "SELECT lulus, courses, status, version, event_seq FROM krs WHERE nim = ?", (nim,)
+        ).fetchone()
+        if row is None:
+            return None
+        krs = self._from_row(nim, *row)
+        self._remember(krs)
+        return krs
+
+    def get_or_create(self, nim):
+        krs = self.get(nim)
+        if krs is None:
+            krs = KRS(Student(nim=nim))
+            self._remember(krs)
+        return krs
+
+    def save(self, krs, events=()):
+        self.save_many([(krs, events)])
+
+    def save_many(self, items):
+        # Semua perubahan KRS beserta event transisinya ditulis dalam satu transaksi
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for krs, events in items:
+                self._write(conn, krs, events)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            for krs, _ in items:
+                self.evict(krs.student.nim)
+            raise
+        for krs, events in items:
+            krs.version += 1
+            krs.event_seq += len(events)
+            self._remember(krs)
+            for event in events:
+                log_transition(event)
+
+    def _write(self, conn, krs, events):
+        nim = krs.student.nim
+        event_seq = krs.event_seq + len(events)
+        payload = (
+            json.dumps(list(krs.student.lulus)),
+            json.dumps([_course_to_dict(c) for c in krs.courses]),
+            krs.status.name,
+            event_seq,
+        )
+        if krs.version == 0:
+            try:
+                conn.execute(
+                    "INSERT INTO krs (nim, lulus, courses, status, event_seq, version) VALUES (?, ?, ?, ?, ?, 1)",
+                    (nim, *payload),
+                )
+            except sqlite3.IntegrityError:
+                raise ConcurrentUpdateError(f"KRS {nim} sudah dibuat oleh proses lain")
+        else:
+            updated = conn.execute(
+                "UPDATE krs SET lulus = ?, courses = ?, status = ?, event_seq = ?, version = version + 1 "
+                "WHERE nim = ? AND version = ?",
+                (*payload, nim, krs.version),
+            ).rowcount
+            if not updated:
+                raise ConcurrentUpdateError(f"KRS {nim} telah diubah oleh proses lain, silakan ulangi")
+        if events:
+            conn.executemany(
+                "INSERT INTO krs_events (nim, seq, from_state, to_state, actor, at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (nim, krs.event_seq + i, e.from_state.name, e.to_state.name, e.actor, e.at.isoformat())
+                    for i, e in enumerate(events, start=1)
+                ],
+            )
+            if event_seq // self.SNAPSHOT_EVERY > krs.event_seq // self.SNAPSHOT_EVERY:
+                conn.execute(
+                    "INSERT OR REPLACE INTO krs_snapshots (nim, seq, status) VALUES (?, ?, ?)",
+                    (nim, event_seq, krs.status.name),
+                )
+
+    def history(self, nim, after_seq=0):
+        rows = self._connection().execute(
+            "SELECT seq, from_state, to_state, actor, at FROM krs_events WHERE nim = ? AND seq > ? ORDER BY seq",
+            (nim, after_seq),
+        )
+        return [
+            (seq, TransitionEvent(nim, KRSStatus[from_state], KRSStatus[to_state], actor, datetime.fromisoformat(at)))
+            for seq, from_state, to_state, actor, at in rows
+        ]
+
+    def rebuild_status(self, nim):
+        # State = snapshot terakhir + replay event setelahnya
+        row = self._connection().execute("SELECT seq, status FROM krs_snapshots WHERE nim = ?", (nim,)).fetchone()
+        seq, status = (row[0], KRSStatus[row[1]]) if row else (0, KRSStatus.DRAFT)
+        machine = KRSStateMachine(status, nim)
+        return machine.replay(event for _, event in self.history(nim, after_seq=seq))
+
+    def list_nims(self, statuses=None):
+        if statuses:
+            placeholders = ", ".join("?" for _ in statuses)
+            rows = self._connection().execute(
+                f"SELECT nim FROM krs WHERE status IN ({placeholders}) ORDER BY nim", [s.name for s in statuses]
+            )
+        else:
+            rows = self._connection().execute("SELECT nim FROM krs ORDER BY nim")
+        return [row[0] for row in rows]
+
+    def load_many(self, nims):
+        # Baca langsung dari database tanpa mengisi cache, untuk pekerjaan batch
+        placeholders = ", ".join("?" for _ in nims)
+        rows = self._connection().execute(
+            f"SELECT nim, lulus, courses, status, version, event_seq FROM krs WHERE nim IN ({placeholders})", list(nims)
+        )
+        return [self._from_row(*row) for row in rows]
+
+    def evict(self, nim):
+        with self._cache_lock:
+            self._cache.pop(nim, None)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _remember(self, krs):
+        with self._cache_lock:
+            self._cache[krs.student.nim] = krs
+            self._cache.move_to_end(krs.student.nim)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _from_row(self, nim, lulus, courses, status, version, event_seq):
+        student = Student(nim=nim, lulus=json.loads(lulus))
+        krs = KRS(student, [Course(**c) for c in json.loads(courses)])
+        krs.status = KRSStatus[status]
+        krs.version = version
+        krs.event_seq = event_seq
+        return krs
+
+
+def _course_to_dict(course):
+    return {
+        "nama": course.nama,
+        "sks": course.sks,
+        "jadwal": course.jadwal,
+        "prasyarat": course.prasyarat,
+        "kode": course.kode,
+        "kelas": course.kelas,
+    }
@@ -0,0 +1,163 @@
+import sqlite3
+import threading
+
+RESERVED = "reserved"
+WAITLISTED = "waitlisted"
+
+
+# Kuota kursi per kelas dengan daftar tunggu. Setiap operasi berjalan dalam satu transaksi
+# BEGIN IMMEDIATE, sehingga kursi tidak pernah melebihi kapasitas meski diakses banyak proses.
+class SeatManager:
+    def __init__(self, path="krs.db"):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        self._connection().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sections (
+                kode TEXT NOT NULL,
+                kelas TEXT NOT NULL,
+                capacity INTEGER NOT NULL,
+                taken INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (kode, kelas),
+                CHECK (taken >= 0)
+            );
+            CREATE TABLE IF NOT EXISTS seats (
+                kode TEXT NOT NULL,
+                kelas TEXT NOT NULL,
+                nim TEXT NOT NULL,
+                PRIMARY KEY (kode, kelas, nim)
+            );
+            CREATE TABLE IF NOT EXISTS waitlist (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kode TEXT NOT NULL,
+                kelas TEXT NOT NULL,
+                nim TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (kode, kelas, nim)
+            );
+            CREATE INDEX IF NOT EXISTS ix_waitlist_order ON waitlist (kode, kelas, priority DESC, id);
+            """
+        )
+
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def reserve(self, kode, kelas, nim, capacity, priority=0):
+        # Hasil: (RESERVED, None) atau (WAITLISTED, posisi antrean)
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "INSERT INTO sections (kode, kelas, capacity) VALUES (?, ?, ?) "
+                "ON CONFLICT (kode, kelas) DO UPDATE SET capacity = excluded.capacity",
+                (kode, kelas, capacity),
+            )
+            held = conn.execute(
+                "SELECT 1 FROM seats WHERE kode = ? AND kelas = ? AND nim = ?", (kode, kelas, nim)
+            ).fetchone()
+            if held:
+                result = (RESERVED, None)
+            elif conn.execute(
+                "UPDATE sections SET taken = taken + 1 WHERE kode = ? AND kelas = ? AND taken < capacity",
+                (kode, kelas),
+            ).rowcount:
+                conn.execute("INSERT INTO seats (kode, kelas, nim) VALUES (?, ?, ?)", (kode, kelas, nim))
+                conn.execute("DELETE FROM waitlist WHERE kode = ? AND kelas = ? AND nim = ?", (kode, kelas, nim))
+                result = (RESERVED, None)
+            else:
+                conn.execute(
+                    "INSERT OR IGNORE INTO waitlist (kode, kelas, nim, priority) VALUES (?, ?, ?, ?)",
+                    (kode, kelas, nim, priority),
+                )
+                result = (WAITLISTED, self._position(conn, kode, kelas, nim))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def release(self, kode, kelas, nim):
+        # Kursi yang dilepas langsung diberikan ke antrean teratas; hasilnya NIM yang dipromosikan
+        conn = self._transaction()
+        try:
+            promoted = None
+            if conn.execute(
+                "DELETE FROM seats WHERE kode = ? AND kelas = ? AND nim = ?", (kode, kelas, nim)
+            ).rowcount:
+                row = conn.execute(
+                    "SELECT id, nim FROM waitlist WHERE kode = ? AND kelas = ? ORDER BY priority DESC, id LIMIT 1",
+                    (kode, kelas),
+                ).fetchone()
+                capacity, taken = conn.execute(
+                    "SELECT capacity, taken FROM sections WHERE kode = ? AND kelas = ?", (kode, kelas)
+                ).fetchone()
+                # Kursi dipindahkan tanpa mengubah penghitung, kecuali kapasitas sempat diturunkan
+                if row is not None and taken <= capacity:
+                    conn.execute("DELETE FROM waitlist WHERE id = ?", (row[0],))
+                    conn.execute("INSERT INTO seats (kode, kelas, nim) VALUES (?, ?, ?)", (kode, kelas, row[1]))
+                    promoted = row[1]
+                else:
+                    conn.execute(
+                        "UPDATE sections SET taken = taken - 1 WHERE kode = ? AND kelas = ?", (kode, kelas)
+                    )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return promoted
+
+    def leave_waitlist(self, kode, kelas, nim):
+        deleted = self._connection().execute(
+            "DELETE FROM waitlist WHERE kode = ? AND kelas = ? AND nim = ?", (kode, kelas, nim)
+        ).rowcount
+        return bool(deleted)
+
+    def position(self, kode, kelas, nim):
+        return self._position(self._connection(), kode, kelas, nim)
+
+    def _position(self, conn, kode, kelas, nim):
+        row = conn.execute(
+            "SELECT priority, id FROM waitlist WHERE kode = ? AND kelas = ? AND nim = ?", (kode, kelas, nim)
+        ).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM waitlist WHERE kode = ? AND kelas = ? "
+            "AND (priority > ? OR (priority = ? AND id < ?))",
+            (kode, kelas, row[0], row[0], row[1]),
+        ).fetchone()[0]
+        return ahead + 1
+
+    def holders(self, kode, kelas):
+        rows = self._connection().execute(
+            "SELECT nim FROM seats WHERE kode = ? AND kelas = ? ORDER BY nim", (kode, kelas)
+        )
+        return [nim for (nim,) in rows]
+
+    def status(self, kode, kelas):
+        conn = self._connection()
+        row = conn.execute("SELECT capacity, taken FROM sections WHERE kode = ? AND kelas = ?", (kode, kelas)).fetchone()
+        capacity, taken = row if row else (None, 0)
+        waiting = conn.execute(
+            "SELECT nim FROM waitlist WHERE kode = ? AND kelas = ? ORDER BY priority DESC, id", (kode, kelas)
+        ).fetchall()
+        return {
+            "kode": kode,
+            "kelas": kelas,
+            "kapasitas": capacity,
+            "terisi": taken,
+            "antrean": [nim for (nim,) in waiting],
+        }
@@ -1,5 +1,10 @@
+import logging
+from datetime import datetime, timezone
 from enum import Enum, auto
 
+logger = logging.getLogger("krs.state_machine")
+
+
 class KRSStatus(Enum):
     DRAFT = auto()
     SUBMITTED = auto()
@@ -11,6 +16,29 @@ class InvalidTransitionError(Exception):
     pass
 
 
+class TransitionEvent:
+    def __init__(self, nim, from_state, to_state, actor=None, at=None):
+        self.nim = nim
+        self.from_state = from_state
+        self.to_state = to_state
+        self.actor = actor
+        self.at = at or datetime.now(timezone.utc)
+
+    def to_dict(self):
+        return {
+            "nim": self.nim,
+            "from": self.from_state.name,
+            "to": self.to_state.name,
+            "actor": self.actor,
+            "at": self.at.isoformat(),
+        }
+
+
+def log_transition(event):
+    # Dipanggil setelah event tersimpan (commit), agar transisi yang di-rollback tidak tercatat
+    logger.info("krs_transition", extra={"event": event.to_dict()})
+
+
 class KRSStateMachine:
     valid_transitions = {
         KRSStatus.DRAFT: [KRSStatus.SUBMITTED],
@@ -19,15 +47,27 @@ class KRSStateMachine:
         KRSStatus.APPROVED: []
     }
 
-    def __init__(self, state=KRSStatus.DRAFT):
+    def __init__(self, state=KRSStatus.DRAFT, nim=None):
         self.state = state
+        self.nim = nim
 
-    def transition(self, new_state):
+    def check(self, new_state):
         allowed = self.valid_transitions.get(self.state, [])
         if new_state not in allowed:
             raise InvalidTransitionError(f"Transisi tidak valid: {self.state.name} → {new_state.name}")
-        print(f"✅ Transisi berhasil: {self.state.name} → {new_state.name}")
+
+    def transition(self, new_state, actor=None):
+        self.check(new_state)
+        event = TransitionEvent(self.nim, self.state, new_state, actor)
         self.state = new_state
+        return event
+
+    def replay(self, events):
+        # Bangun ulang state dari event tersimpan; transisi tetap diperiksa agar log yang rusak ketahuan
+        for event in events:
+            self.check(event.to_state)
+            self.state = event.to_state
+        return self.state
 
     def __str__(self):
         return f"Status KRS saat ini: {self.state.name}"
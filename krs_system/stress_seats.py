@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from seats import SeatManager, RESERVED
+
+# --- Uji beban lokal: banyak proses berebut kursi kelas yang sama ---
+KODE = "STRESS"
+KELAS = "A"
+
+
+def _worker(db_path, nims, capacity, drop_rate, seed):
+    seats = SeatManager(db_path)
+    rng = random.Random(seed)
+    reserved = waitlisted = dropped = 0
+    for nim in nims:
+        state, _ = seats.reserve(KODE, KELAS, nim, capacity, priority=rng.randint(0, 2))
+        if state == RESERVED:
+            reserved += 1
+            if rng.random() < drop_rate:
+                seats.release(KODE, KELAS, nim)
+                dropped += 1
+        else:
+            waitlisted += 1
+    return reserved, waitlisted, dropped
+
+
+def check_invariants(seats):
+    conn = seats._connection()
+    capacity, taken = conn.execute(
+        "SELECT capacity, taken FROM sections WHERE kode = ? AND kelas = ?", (KODE, KELAS)
+    ).fetchone()
+    holders = seats.holders(KODE, KELAS)
+    waiting = seats.status(KODE, KELAS)["antrean"]
+    errors = []
+    if taken > capacity:
+        errors.append(f"overbooking: {taken} > {capacity}")
+    if taken != len(holders):
+        errors.append(f"penghitung {taken} tidak sama dengan jumlah kursi {len(holders)}")
+    if set(holders) & set(waiting):
+        errors.append("mahasiswa tercatat duduk sekaligus menunggu")
+    if waiting and taken < capacity:
+        errors.append("ada kursi kosong padahal antrean tidak kosong")
+    return {"kapasitas": capacity, "terisi": taken, "antrean": len(waiting), "errors": errors}
+
+
+def run(db_path, students=2000, capacity=100, workers=8, drop_rate=0.1, seed=0):
+    SeatManager(db_path)
+    nims = [f"S{i:06d}" for i in range(students)]
+    shards = [nims[i::workers] for i in range(workers)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_worker, db_path, shard, capacity, drop_rate, seed + i) for i, shard in enumerate(shards)
+        ]
+        totals = [sum(counts) for counts in zip(*(f.result() for f in futures))]
+    report = check_invariants(SeatManager(db_path))
+    report.update({
+        "requests": students,
+        "reserved": totals[0],
+        "waitlisted": totals[1],
+        "dropped": totals[2],
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban reservasi kursi KRS")
+    parser.add_argument("--db", help="berkas SQLite (default: berkas sementara)")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--drop-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "stress.db")
+        report = run(db_path, args.students, args.capacity, args.workers, args.drop_rate)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(1 if report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
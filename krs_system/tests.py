@@ -1,6 +1,9 @@
 import pytest
-from api import app, krs, machine, KRSStatus
+import api
+from api import app, KRSStatus
 from models import Course
+from repository import KRSRepository, ConcurrentUpdateError
+from seats import SeatManager
 from hypothesis import given, settings, strategies as st
 
 course_strategy = st.fixed_dictionaries({
@@ -23,14 +26,37 @@ def client():
     with app.test_client() as client:
         yield client
 
+NIM = "12345"
+
+TEST_CATALOG = [
+    {"kode": "MK101", "nama": "Matematika Dasar", "sks": 3, "sections": {"A": "Senin 10:00"}},
+    {"kode": "MK102", "nama": "Kalkulus", "sks": 3, "prasyarat": ["MK101"], "sections": {"A": "Selasa 08:00"}},
+    {"kode": "MK201", "nama": "Matematika Lanjutan", "sks": 3, "prasyarat": ["MK101"], "sections": {"A": "Senin 08:00"}},
+    {"kode": "MK301", "nama": "Analisis Real", "sks": 3, "prasyarat": ["MK102"], "sections": {"A": "Kamis 08:00"}},
+    {"kode": "IF102", "nama": "PBO", "sks": 3, "sections": {"A": "Selasa 10:00", "B": "Rabu 10:00"}},
+    {"kode": "IF301", "nama": "Kecerdasan Buatan", "sks": 3, "sections": {"A": "Jumat 08:00"}, "kapasitas": 1},
+] + [
+    {"kode": f"C{i:02d}", "nama": f"Course {i}", "sks": 4, "sections": {"A": f"Day {i}"}} for i in range(11)
+]
+
 @pytest.fixture(autouse=True)
-def reset_state():
-    # Reset KRS and machine state before each test
-    krs.courses.clear()
-    machine.state = KRSStatus.DRAFT
+def reset_state(tmp_path, monkeypatch):
+    # Fresh repository per test, with one student who passed Matematika Dasar
+    repo = KRSRepository(str(tmp_path / "krs.db"))
+    monkeypatch.setattr(api, "repo", repo)
+    monkeypatch.setattr(api, "seats", SeatManager(repo.path))
+    api.catalog.load(TEST_CATALOG)
+    krs = repo.get_or_create(NIM)
+    krs.student.lulus = ["Matematika Dasar"]
+    repo.save(krs)
+    yield repo
+    api.catalog.reload()
+
+def stored_krs(nim=NIM):
+    return api.repo.get(nim)
 
 def test_get_krs(client):
-    response = client.get('/krs')
+    response = client.get(f'/krs/{NIM}')
     assert response.status_code == 200
     data = response.get_json()
     assert 'nim' in data
@@ -39,120 +65,377 @@ def test_get_krs(client):
     assert 'total_sks' in data
 
 def test_add_course_success(client):
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Matematika Dasar"]
-    }
-    response = client.post('/krs/add', json=course_data)
+    course_data = {"kode": "MK201"}
+    response = client.post(f'/krs/{NIM}/add', json=course_data)
     assert response.status_code == 200
     data = response.get_json()
     assert data['success'] == True
-    assert len(krs.courses) == 1
+    assert len(stored_krs().courses) == 1
 
 def test_add_course_validation_fail(client):
     # Add a course that exceeds SKS limit
     for i in range(10):
-        course_data = {
-            "nama": f"Course {i}",
-            "sks": 4,
-            "jadwal": f"Day {i}",
-            "prasyarat": []
-        }
-        client.post('/krs/add', json=course_data)
+        course_data = {"kode": f"C{i:02d}"}
+        client.post(f'/krs/{NIM}/add', json=course_data)
     # Try to add one more
-    course_data = {
-        "nama": "Extra Course",
-        "sks": 4,
-        "jadwal": "Extra Day",
-        "prasyarat": []
-    }
-    response = client.post('/krs/add', json=course_data)
+    course_data = {"kode": "C10"}
+    response = client.post(f'/krs/{NIM}/add', json=course_data)
     assert response.status_code == 400
     data = response.get_json()
     assert data['success'] == False
 
 def test_remove_course_success(client):
     # First add a course
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Matematika Dasar"]
-    }
-    client.post('/krs/add', json=course_data)
+    course_data = {"kode": "MK201"}
+    client.post(f'/krs/{NIM}/add', json=course_data)
     # Now remove it
-    response = client.delete('/krs/remove', json={"nama": "Matematika Lanjutan"})
+    response = client.delete(f'/krs/{NIM}/remove', json={"nama": "Matematika Lanjutan"})
     assert response.status_code == 200
     data = response.get_json()
     assert data['success'] == True
-    assert len(krs.courses) == 0
+    assert len(stored_krs().courses) == 0
 
 def test_remove_course_not_found(client):
-    response = client.delete('/krs/remove', json={"nama": "Nonexistent Course"})
+    response = client.delete(f'/krs/{NIM}/remove', json={"nama": "Nonexistent Course"})
     assert response.status_code == 404
     data = response.get_json()
     assert data['success'] == False
 
 def test_submit_krs_success(client):
     # Add a valid course
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Matematika Dasar"]
-    }
-    client.post('/krs/add', json=course_data)
-    response = client.post('/krs/submit')
+    course_data = {"kode": "MK201"}
+    client.post(f'/krs/{NIM}/add', json=course_data)
+    response = client.post(f'/krs/{NIM}/submit')
     assert response.status_code == 200
     data = response.get_json()
     assert data['success'] == True
-    assert machine.state == KRSStatus.SUBMITTED
+    assert stored_krs().status == KRSStatus.SUBMITTED
 
 def test_submit_krs_fail(client):
     # Try to submit with prerequisite not met
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Kalkulus"]
-    }
-    response = client.post('/krs/add', json=course_data)
+    course_data = {"kode": "MK301"}
+    response = client.post(f'/krs/{NIM}/add', json=course_data)
     assert response.status_code == 400
     data = response.get_json()
     assert data['success'] == False
 
 def test_revise_krs(client):
     # First submit
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Matematika Dasar"]
-    }
-    client.post('/krs/add', json=course_data)
-    client.post('/krs/submit')
+    course_data = {"kode": "MK201"}
+    client.post(f'/krs/{NIM}/add', json=course_data)
+    client.post(f'/krs/{NIM}/submit')
     # Now revise
-    response = client.post('/krs/revision')
+    response = client.post(f'/krs/{NIM}/revision')
     assert response.status_code == 200
     data = response.get_json()
     assert data['success'] == True
-    assert machine.state == KRSStatus.REVISION
+    assert stored_krs().status == KRSStatus.REVISION
 
 def test_approve_krs(client):
     # First submit
-    course_data = {
-        "nama": "Matematika Lanjutan",
-        "sks": 3,
-        "jadwal": "Senin 08:00",
-        "prasyarat": ["Matematika Dasar"]
-    }
-    client.post('/krs/add', json=course_data)
-    client.post('/krs/submit')
+    course_data = {"kode": "MK201"}
+    client.post(f'/krs/{NIM}/add', json=course_data)
+    client.post(f'/krs/{NIM}/submit')
     # Now approve directly from SUBMITTED
-    response = client.post('/krs/approve')
+    response = client.post(f'/krs/{NIM}/approve')
     assert response.status_code == 200
     data = response.get_json()
     assert data['success'] == True
-    assert machine.state == KRSStatus.APPROVED
+    assert stored_krs().status == KRSStatus.APPROVED
+
+def test_students_are_isolated(client):
+    course_data = {"kode": "IF102"}
+    client.post('/krs/11111/add', json=course_data)
+    assert len(stored_krs("11111").courses) == 1
+    assert len(stored_krs().courses) == 0
+
+def test_krs_persists_after_cache_eviction(client):
+    course_data = {"kode": "IF102"}
+    client.post(f'/krs/{NIM}/add', json=course_data)
+    client.post(f'/krs/{NIM}/submit')
+    api.repo.clear_cache()
+    krs = stored_krs()
+    assert [c.nama for c in krs.courses] == ["PBO"]
+    assert krs.status == KRSStatus.SUBMITTED
+    assert krs.student.lulus == ["Matematika Dasar"]
+
+def test_stale_version_is_rejected(reset_state):
+    other = KRSRepository(reset_state.path)
+    stale = other.get(NIM)
+    krs = reset_state.get(NIM)
+    krs.add_course(Course("PBO", 3, "Selasa 10:00"))
+    reset_state.save(krs)
+    stale.add_course(Course("Basis Data", 3, "Rabu 10:00"))
+    with pytest.raises(ConcurrentUpdateError):
+        other.save(stale)
+
+def test_transition_is_logged_only_after_commit(reset_state):
+    import logging
+    from state_machine import KRSStateMachine
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("krs.state_machine")
+    logger.addHandler(handler)
+    try:
+        other = KRSRepository(reset_state.path)
+        stale = other.get(NIM)
+        reset_state.save(reset_state.get(NIM))
+        event = KRSStateMachine(stale.status, NIM).transition(KRSStatus.SUBMITTED)
+        with pytest.raises(ConcurrentUpdateError):
+            other.save(stale, [event])
+        assert records == []
+        krs = reset_state.get(NIM)
+        reset_state.save(krs, [KRSStateMachine(krs.status, NIM).transition(KRSStatus.SUBMITTED)])
+        assert [r.event["to"] for r in records] == ["SUBMITTED"]
+    finally:
+        logger.removeHandler(handler)
+
+def test_running_aggregates_follow_add_and_remove():
+    from models import KRS, Student
+    krs = KRS(Student("1", lulus=["Algoritma"]), [Course("PBO", 3, "Selasa 10:00")])
+    krs.add_course(Course("Basis Data", 4, "Rabu 08:00"))
+    assert krs.total_sks() == 7
+    assert krs.clashes(Course("Sistem Operasi", 2, "Rabu 08:30")) and krs.has_course("PBO")
+    krs.remove_course("PBO")
+    assert krs.total_sks() == 4
+    assert not krs.clashes(Course("Sistem Operasi", 2, "Selasa 10:00")) and not krs.has_course("PBO")
+
+def test_add_unknown_course_code(client):
+    response = client.post(f'/krs/{NIM}/add', json={"kode": "XX999"})
+    assert response.status_code == 404
+
+def test_client_prerequisites_are_ignored(client):
+    # Analisis Real butuh Kalkulus menurut katalog, apa pun yang dikirim klien
+    response = client.post(f'/krs/{NIM}/add', json={"kode": "MK301", "prasyarat": []})
+    assert response.status_code == 400
+    assert "Kalkulus" in response.get_json()['message']
+
+def test_add_course_section(client):
+    response = client.post(f'/krs/{NIM}/add', json={"kode": "IF102", "kelas": "B"})
+    assert response.status_code == 200
+    assert stored_krs().courses[0].jadwal == "Rabu 10:00"
+
+def test_catalog_transitive_closure():
+    from catalog import CourseCatalog, CatalogError
+    from models import Student
+    catalog = CourseCatalog()
+    catalog.load(TEST_CATALOG)
+    assert sorted(catalog.closure("MK301")) == ["Kalkulus", "Matematika Dasar"]
+    # Lulus Kalkulus berarti prasyarat Kalkulus (Matematika Dasar) juga terpenuhi
+    mask = catalog.passed_mask(Student("1", lulus=["MK102"]))
+    assert catalog.missing_prerequisites("MK201", mask) == []
+    assert catalog.missing_prerequisites("MK301", 0) == ["Kalkulus"]
+    with pytest.raises(CatalogError):
+        catalog.load([{"kode": "A", "nama": "A", "sks": 1, "prasyarat": ["B"]},
+                      {"kode": "B", "nama": "B", "sks": 1, "prasyarat": ["A"]}])
+
+def test_catalog_reload(client, tmp_path, monkeypatch):
+    import json
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps({"courses": TEST_CATALOG[:1]}))
+    monkeypatch.setattr(api.catalog, "path", str(path))
+    response = client.post('/catalog/reload')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 1
+    assert client.post(f'/krs/{NIM}/add', json={"kode": "IF102"}).status_code == 404
+
+def test_delta_validation_matches_full_chain():
+    from models import KRS, Student
+    krs = KRS(Student("1", lulus=["Algoritma"]), [Course("PBO", 3, "Selasa 10:00")])
+    chain = api.sks_validator
+    candidates = [
+        Course("Struktur Data", 3, "Rabu 08:00", ["Algoritma"]),
+        Course("Kecerdasan Buatan", 3, "Rabu 10:00", ["Statistika"]),
+        Course("Jaringan", 3, "Selasa 10:00"),
+        Course("PBO", 3, "Kamis 10:00"),
+        Course("Skripsi", 22, "Jumat 08:00"),
+    ]
+    for course in candidates:
+        delta = chain.handle_add(krs, course)
+        krs.courses = krs.courses + (course,)
+        full = chain.handle(krs)
+        krs.courses = krs.courses[:-1]
+        assert delta.success == full.success
+        assert delta.message == full.message
+
+def test_krs_courses_is_read_only():
+    from models import KRS, Student
+    krs = KRS(Student("1"), [Course("PBO", 3, "Selasa 10:00")])
+    with pytest.raises(AttributeError):
+        krs.courses.append(Course("Jaringan", 3, "Rabu 10:00"))
+    krs.add_course(Course("Jaringan", 3, "Rabu 10:00"))
+    assert [c.nama for c in krs.courses] == ["PBO", "Jaringan"]
+
+def test_parse_jadwal_intervals():
+    from jadwal import parse_jadwal
+    slots = parse_jadwal("Senin 08:00-10:30, Rabu 13:00-14:40")
+    assert [(s.hari, s.mulai, s.selesai) for s in slots] == [(0, 480, 630), (2, 780, 880)]
+    # Tanpa jam selesai: 50 menit per SKS
+    assert parse_jadwal("Selasa 10:00", sks=3)[0].selesai == 10 * 60 + 150
+    assert parse_jadwal("Day 1") is None
+
+def test_conflict_validator_reports_overlapping_pairs():
+    from models import KRS, Student
+    from validators import ConflictValidator
+    krs = KRS(Student("1"), [
+        Course("A", 2, "Senin 08:00-10:30"),
+        Course("B", 2, "Senin 09:00-11:00"),
+        Course("C", 2, "Senin 10:30-12:00"),
+        Course("D", 2, "Selasa 08:00-09:00, Kamis 10:00-12:00"),
+        Course("E", 2, "Kamis 11:00-11:30"),
+    ])
+    result = ConflictValidator().validate(krs)
+    assert not result.success
+    assert [(d["a"], d["b"]) for d in result.details] == [("A", "B"), ("B", "C"), ("D", "E")]
+    # Jam bersebelahan (10:30 selesai, 10:30 mulai) tidak dianggap bentrok
+    assert ("A", "C") not in [(d["a"], d["b"]) for d in result.details]
+
+def test_add_course_time_overlap_rejected(client):
+    api.catalog.load(TEST_CATALOG + [
+        {"kode": "X1", "nama": "Statistika", "sks": 2, "sections": {"A": "Rabu 08:00-10:30"}},
+        {"kode": "X2", "nama": "Etika", "sks": 2, "sections": {"A": "Rabu 09:00-11:00"}},
+    ])
+    assert client.post(f'/krs/{NIM}/add', json={"kode": "X1"}).status_code == 200
+    response = client.post(f'/krs/{NIM}/add', json={"kode": "X2"})
+    assert response.status_code == 400
+    assert response.get_json()['details'] == [
+        {"a": "Statistika", "b": "Etika", "jadwal_a": "Rabu 08:00-10:30", "jadwal_b": "Rabu 09:00-11:00"}
+    ]
+
+def test_validate_all_rejects_invalid_workers(client):
+    for workers in (0, -1, "4", 1.5, True):
+        response = client.post('/krs/validate-all', json={"workers": workers})
+        assert response.status_code == 400
+        assert "workers" in response.get_json()["message"]
+
+def test_batch_validation_groups_failures_by_rule(tmp_path):
+    import json
+    import batch_validate
+    from models import KRS, Student
+    catalog_path = tmp_path / "catalog.json"
+    catalog_path.write_text(json.dumps({"courses": TEST_CATALOG}))
+    repo = KRSRepository(str(tmp_path / "batch.db"))
+    students = {
+        "A1": ["MK201"],                  # valid
+        "A2": ["MK301"],                  # prasyarat Kalkulus belum lulus
+        "A3": ["MK201", "MK301"],         # MK301 prasyaratnya belum lulus
+        "A4": [f"C{i:02d}" for i in range(7)],  # 28 SKS
+    }
+    from catalog import CourseCatalog
+    catalog = CourseCatalog(str(catalog_path))
+    for nim, kodes in students.items():
+        krs = KRS(Student(nim, lulus=["Matematika Dasar"]), [catalog.course_for(k) for k in kodes], KRSStatus.SUBMITTED)
+        repo.save(krs)
+    repo.save(KRS(Student("D1"), [catalog.course_for("MK301")]))  # DRAFT, tidak ikut diperiksa
+
+    report = batch_validate.validate_all(str(tmp_path / "batch.db"), str(catalog_path), workers=2, shard_size=2)
+    assert report["checked"] == 4
+    assert report["failed"] == 3
+    assert report["by_rule"]["PrerequisiteValidator"]["count"] == 2
+    assert [s["nim"] for s in report["by_rule"]["SKSValidator"]["students"]] == ["A4"]
+
+def test_transition_history_is_replayed(client, reset_state):
+    client.post(f'/krs/{NIM}/add', json={"kode": "MK201"})
+    client.post(f'/krs/{NIM}/submit')
+    client.post(f'/krs/{NIM}/revision', json={"actor": "dosen01"})
+    client.post(f'/krs/{NIM}/submit')
+    response = client.get(f'/krs/{NIM}/history')
+    data = response.get_json()
+    assert data["status"] == "SUBMITTED"
+    assert [(e["seq"], e["to"]) for e in data["events"]] == [(1, "SUBMITTED"), (2, "REVISION"), (3, "SUBMITTED")]
+    assert data["events"][1]["actor"] == "dosen01"
+    reset_state.SNAPSHOT_EVERY = 2
+    client.post(f'/krs/{NIM}/approve')
+    assert reset_state.rebuild_status(NIM) == KRSStatus.APPROVED
+
+def test_bulk_transition_by_advisor(client, reset_state):
+    from models import KRS, Student
+    for nim in ["A1", "A2"]:
+        reset_state.save(KRS(Student(nim), [], KRSStatus.SUBMITTED))
+    response = client.post('/krs/transition', json={"nims": ["A1", "A2", NIM, "X9"], "to": "APPROVED", "actor": "dosen01"})
+    data = response.get_json()
+    assert data["transitioned"] == ["A1", "A2"]
+    assert [i["nim"] for i in data["invalid"]] == [NIM]
+    assert data["not_found"] == ["X9"]
+    assert stored_krs("A1").status == KRSStatus.APPROVED
+    assert reset_state.history("A2")[0][1].actor == "dosen01"
+
+def test_full_section_waitlist_is_promoted_on_remove(client):
+    assert client.post(f'/krs/{NIM}/add', json={"kode": "IF301"}).status_code == 200
+    response = client.post('/krs/A1/add', json={"kode": "IF301"})
+    assert response.status_code == 202
+    assert response.get_json()["waitlist_position"] == 1
+    client.post('/krs/A2/add', json={"kode": "IF301"})
+    assert api.seats.status("IF301", "A")["antrean"] == ["A1", "A2"]
+
+    response = client.delete(f'/krs/{NIM}/remove', json={"kode": "IF301"})
+    assert response.get_json()["promoted"] == "A1"
+    assert [c.kode for c in stored_krs("A1").courses] == ["IF301"]
+    assert api.seats.status("IF301", "A") == {"kode": "IF301", "kelas": "A", "kapasitas": 1, "terisi": 1, "antrean": ["A2"]}
+
+def test_seat_reservation_never_overbooks(tmp_path):
+    import stress_seats
+    report = stress_seats.run(str(tmp_path / "stress.db"), students=400, capacity=25, workers=4, drop_rate=0.2)
+    assert report["errors"] == []
+    assert report["terisi"] == 25
+
+def test_courses_are_interned_and_immutable(client):
+    client.post(f'/krs/{NIM}/add', json={"kode": "IF102", "kelas": "B"})
+    client.post('/krs/11111/add', json={"kode": "IF102", "kelas": "B"})
+    api.repo.clear_cache()
+    mine, theirs = stored_krs().courses[0], stored_krs("11111").courses[0]
+    assert mine is theirs and mine is api.catalog.course_for("IF102", "B")
+    with pytest.raises(AttributeError):
+        mine.sks = 4
+
+def test_compact_krs_uses_less_memory():
+    import bench_memory
+    report = bench_memory.run(students=300)
+    assert report["compact_bytes"] < report["legacy_bytes"] / 2
+
+def test_plan_picks_best_conflict_free_sections(client):
+    client.post(f'/krs/{NIM}/add', json={"kode": "IF102", "kelas": "B"})  # Rabu 10:00
+    wishes = [
+        {"kode": "MK102", "prioritas": 5},          # Selasa 08:00, 3 SKS
+        {"kode": "MK301", "prioritas": 9},          # prasyarat Kalkulus belum lulus
+        {"kode": "MK201", "prioritas": 4},          # Senin 08:00
+        {"kode": "IF102", "prioritas": 2},          # sudah di KRS
+    ] + [{"kode": f"C{i:02d}", "prioritas": 3} for i in range(6)]
+    response = client.post(f'/krs/{NIM}/plan', json={"wishes": wishes})
+    data = response.get_json()
+    chosen = [c["kode"] for c in data["courses"]]
+    assert data["optimal"] and data["total_sks"] <= 24
+    assert "MK102" in chosen and "MK201" in chosen and len(chosen) == 5 and data["score"] == 18
+    assert {e["kode"] for e in data["excluded"]} == {"MK301", "IF102"}
+
+    krs = stored_krs()
+    for c in data["courses"]:
+        krs.add_course(api.catalog.course_for(c["kode"], c["kelas"]))
+    assert api.sks_validator.handle(krs).success
+
+def test_plan_rejects_non_positive_or_non_numeric_priority(client):
+    for prioritas in (0, -2, "tinggi"):
+        response = client.post(f'/krs/{NIM}/plan', json={"wishes": [{"kode": "MK102", "prioritas": prioritas}]})
+        assert response.status_code == 400
+        assert "Prioritas MK102" in response.get_json()["message"]
+
+def test_plan_rejects_kelas_that_is_not_a_list(client):
+    response = client.post(f'/krs/{NIM}/plan', json={"wishes": [{"kode": "MK102", "kelas": "A1"}]})
+    assert response.status_code == 400
+    assert "Kelas MK102" in response.get_json()["message"]
+
+def test_plan_returns_feasible_incumbent_when_time_runs_out(monkeypatch):
+    import planner
+    from models import KRS, Student
+    monkeypatch.setattr(planner, "DEADLINE_CHECK_EVERY", 1)
+    wishes = [{"kode": "MK102", "prioritas": 5}, {"kode": "MK201", "prioritas": 4}] + [
+        {"kode": f"C{i:02d}", "prioritas": 3} for i in range(6)
+    ]
+    krs = KRS(Student(NIM, lulus=["Matematika Dasar"]), [])
+    result = planner.plan(api.catalog, krs, wishes, time_budget_ms=0)
+    assert not result.optimal and result.nodes == 1
+    assert result.courses and result.total_sks() <= 24
+    for course in result.courses:
+        krs.add_course(course)
+    assert api.sks_validator.handle(krs).success
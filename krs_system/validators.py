@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
+from jadwal import find_conflicts, format_conflicts
+
+MAX_SKS = 24
+
 
 class ValidationResult:
-    def __init__(self, success, message=""):
+    def __init__(self, success, message="", details=None):
         self.success = success
         self.message = message
+        self.details = details
 
     def __str__(self):
         status = "PASS" if self.success else "FAIL"
@@ -26,34 +31,101 @@ class Validator(ABC):
             return self._next.handle(krs)
         return ValidationResult(True, "Semua validasi berhasil!")
 
+    # --- Mode audit: jalankan seluruh rantai dan kumpulkan semua kegagalan ---
+    def collect_errors(self, krs):
+        errors = []
+        validator = self
+        while validator:
+            result = validator.validate(krs)
+            if not result.success:
+                errors.append((type(validator).__name__, result))
+            validator = validator._next
+        return errors
+
+    # --- Validasi delta: hanya memeriksa mata kuliah yang ditambah/dihapus ---
+    def handle_add(self, krs, course):
+        result = self.validate_add(krs, course)
+        if not result.success:
+            return result
+        if self._next:
+            return self._next.handle_add(krs, course)
+        return ValidationResult(True, "Semua validasi berhasil!")
+
+    def handle_remove(self, krs, course):
+        result = self.validate_remove(krs, course)
+        if not result.success:
+            return result
+        if self._next:
+            return self._next.handle_remove(krs, course)
+        return ValidationResult(True, "Semua validasi berhasil!")
+
     @abstractmethod
     def validate(self, krs):
         pass
 
+    def validate_add(self, krs, course):
+        # Fallback untuk validator tanpa versi delta: validasi penuh dengan mata kuliah baru
+        krs.add_course(course)
+        try:
+            return self.validate(krs)
+        finally:
+            krs.pop_course()
+
+    def validate_remove(self, krs, course):
+        return ValidationResult(True, f"{course.nama} dapat dihapus")
+
 
 class SKSValidator(Validator):
     def validate(self, krs):
-        total = krs.total_sks()
-        if total > 24:
-            return ValidationResult(False, f"Total SKS {total} > 24!")
+        total = sum(course.sks for course in krs.courses)
+        if total > MAX_SKS:
+            return ValidationResult(False, f"Total SKS {total} > {MAX_SKS}!")
+        return ValidationResult(True, "Total SKS valid")
+
+    def validate_add(self, krs, course):
+        total = krs.total_sks() + course.sks
+        if total > MAX_SKS:
+            return ValidationResult(False, f"Total SKS {total} > {MAX_SKS}!")
         return ValidationResult(True, "Total SKS valid")
 
 
 class PrerequisiteValidator(Validator):
+    def __init__(self, catalog=None, next_validator=None):
+        super().__init__(next_validator)
+        self.catalog = catalog
+
     def validate(self, krs):
         for course in krs.courses:
-            prasyarats = course.prasyarat if isinstance(course.prasyarat, list) else [course.prasyarat] if course.prasyarat else []
-            for prasyarat in prasyarats:
-                if prasyarat not in krs.student.lulus:
-                    return ValidationResult(False, f"Belum lulus prasyarat {prasyarat} untuk {course.nama}")
+            result = self.validate_add(krs, course)
+            if not result.success:
+                return result
+        return ValidationResult(True, "Semua prasyarat terpenuhi")
+
+    def validate_add(self, krs, course):
+        if self.catalog is not None and course.kode in self.catalog:
+            # Prasyarat diambil dari katalog server, bukan dari data yang dikirim klien
+            missing = self.catalog.missing_prerequisites(course.kode, self.catalog.passed_mask(krs.student))
+        else:
+            missing = [p for p in course.prasyarat_list() if p not in krs.student.lulus_set]
+        if missing:
+            return ValidationResult(False, f"Belum lulus prasyarat {missing[0]} untuk {course.nama}")
         return ValidationResult(True, "Semua prasyarat terpenuhi")
 
 
 class ConflictValidator(Validator):
     def validate(self, krs):
-        jadwals = [c.jadwal for c in krs.courses]
-        if len(jadwals) != len(set(jadwals)):
-            return ValidationResult(False, "Terdapat bentrok jadwal!")
+        return self._result(find_conflicts(krs.courses))
+
+    def validate_add(self, krs, course):
+        return self._result([(other, course) for other in krs.clashes(course)])
+
+    def _result(self, pairs):
+        if pairs:
+            return ValidationResult(
+                False,
+                f"Terdapat bentrok jadwal: {format_conflicts(pairs)}",
+                [{"a": a.nama, "b": b.nama, "jadwal_a": a.jadwal, "jadwal_b": b.jadwal} for a, b in pairs],
+            )
         return ValidationResult(True, "Tidak ada bentrok jadwal")
 
 
@@ -63,3 +135,14 @@ class DuplicateValidator(Validator):
         if len(names) != len(set(names)):
             return ValidationResult(False, "Terdapat mata kuliah duplikat!")
         return ValidationResult(True, "Tidak ada duplikasi mata kuliah")
+
+    def validate_add(self, krs, course):
+        if krs.has_course(course.nama):
+            return ValidationResult(False, "Terdapat mata kuliah duplikat!")
+        return ValidationResult(True, "Tidak ada duplikasi mata kuliah")
+
+
+def build_validator_chain(catalog=None):
+    sks_validator = SKSValidator()
+    sks_validator.set_next(PrerequisiteValidator(catalog)).set_next(ConflictValidator()).set_next(DuplicateValidator())
+    return sks_validator
@@ -1,11 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, FastAPI, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from . import models, schemas, crud, utils
-from .database import SessionLocal, engine, Base
+from . import models, schemas, crud, utils, cache, ranking
+from .documents import RangeNotSatisfiable, content_disposition, document_store, parse_range
+from .reference import InvalidReferenceError, reference_cache
+from .stats import admission_stats
+from .database import ASYNC_MODE, SessionLocal, engine, Base
 
 Base.metadata.create_all(bind=engine)
+for index in models.CalonMahasiswa.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 app = FastAPI(title="PMB API", version="1.0")
+router = APIRouter()
+
+@app.on_event("startup")
+def load_reference_data():
+    reference_cache.refresh()
+    admission_stats.rebuild()
 
 def get_db():
     db = SessionLocal()
@@ -14,22 +29,54 @@ def get_db():
     finally:
         db.close()
 
-@app.post("/api/pmb/register", response_model=schemas.CalonOut, status_code=status.HTTP_201_CREATED)
+@router.post("/api/pmb/register", response_model=schemas.CalonOut, status_code=status.HTTP_201_CREATED)
 def register(calon_in: schemas.CalonCreate, db: Session = Depends(get_db)):
     try:
         calon = crud.create_calon(db, calon_in)
+    except InvalidReferenceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=409, detail=str(e))
     return calon
 
-@app.get("/api/pmb/status/{id}", response_model=schemas.CalonOut)
-def status(id: int, db: Session = Depends(get_db)):
-    calon = crud.get_calon(db, id)
-    if not calon:
-        raise HTTPException(status_code=404, detail="Calon tidak ditemukan")
-    return calon
+@app.post("/api/pmb/register/bulk", response_model=schemas.BulkRegisterOut)
+async def register_bulk(request: Request, db: Session = Depends(get_db)):
+    content_type = request.headers.get("content-type", "")
+    if "csv" not in content_type and "ndjson" not in content_type:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Gunakan text/csv atau application/x-ndjson")
+    body = await request.body()
+    try:
+        rows = utils.parse_bulk_rows(body, content_type)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Isi berkas harus berenkode UTF-8")
+    results = await run_in_threadpool(crud.create_calon_bulk, db, rows)
+    counts = {"created": 0, "duplicate_email": 0, "validation_error": 0}
+    for r in results:
+        counts[r.status] += 1
+    return schemas.BulkRegisterOut(
+        created=counts["created"],
+        duplicate=counts["duplicate_email"],
+        invalid=counts["validation_error"],
+        results=results,
+    )
+
+@router.get("/api/pmb/status/{id}", response_model=schemas.CalonOut)
+def calon_status(id: int, request: Request, db: Session = Depends(get_db)):
+    cached = cache.calon_cache.get(id)
+    if cached is None:
+        generation = cache.calon_cache.generation(id)
+        calon = crud.get_calon(db, id)
+        if not calon:
+            raise HTTPException(status_code=404, detail="Calon tidak ditemukan")
+        cached = utils.calon_cache_entry(calon)
+        cache.calon_cache.set(id, cached, generation)
+    return utils.etag_response(request, *cached)
+
+@app.get("/api/pmb/cache/stats")
+def cache_stats():
+    return cache.calon_cache.stats()
 
-@app.put("/api/pmb/approve/{id}", response_model=schemas.CalonOut)
+@router.put("/api/pmb/approve/{id}", response_model=schemas.CalonOut)
 def approve(id: int, db: Session = Depends(get_db)):
     def nim_callable(session_db, tahun, kode_prodi):
         return utils.generate_nim(session_db, tahun, kode_prodi)
@@ -39,3 +86,144 @@ def approve(id: int, db: Session = Depends(get_db)):
     elif reason == "already_approved":
         raise HTTPException(status_code=400, detail="Calon sudah disetujui")
     return calon
+
+@router.put("/api/pmb/approve", response_model=schemas.BatchApproveOut)
+def approve_batch(batch_in: schemas.BatchApproveIn, db: Session = Depends(get_db)):
+    if batch_in.ids is None and batch_in.program_studi_id is None and batch_in.jalur_masuk_id is None:
+        raise HTTPException(status_code=400, detail="Isi ids atau filter program_studi_id/jalur_masuk_id")
+    def nim_batch_callable(session_db, tahun, kode_prodi, count):
+        return utils.nim_allocator.allocate(session_db, tahun, kode_prodi, count)
+    return crud.approve_calon_batch(db, batch_in, nim_batch_callable)
+
+@app.get("/api/pmb/calon")
+def list_calon(
+    status: Optional[models.StatusEnum] = None,
+    program_studi_id: Optional[int] = None,
+    jalur_masuk_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = Query(None, min_length=1),
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    rows = crud.list_calon(db, status, program_studi_id, jalur_masuk_id, created_from, created_to, q, cursor, limit + 1)
+
+    def stream():
+        yield '{"data":['
+        last_id = None
+        for i, calon in enumerate(rows):
+            if i == limit:
+                break
+            yield ("," if i else "") + schemas.CalonOut.from_orm(calon).json()
+            last_id = calon.id
+        else:
+            last_id = None
+        yield '],"next_cursor":' + ("null" if last_id is None else str(last_id)) + "}"
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+@app.get("/api/pmb/reference")
+def reference_data():
+    return reference_cache.snapshot()
+
+@app.post("/api/pmb/reference/refresh")
+def refresh_reference_data():
+    reference_cache.refresh()
+    return {"version": reference_cache.version}
+
+@app.put("/api/pmb/skor")
+def upsert_skor(skor_in: List[schemas.SkorIn], db: Session = Depends(get_db)):
+    return {"updated": crud.upsert_skor(db, skor_in)}
+
+@app.post("/api/pmb/ranking", response_model=schemas.RankingOut)
+def rank_calon(ranking_in: schemas.RankingIn, db: Session = Depends(get_db)):
+    if not ranking_in.weights:
+        raise HTTPException(status_code=400, detail="weights tidak boleh kosong")
+    approved = crud.count_approved_by_group(db)
+    quotas = {
+        (q.program_studi_id, q.jalur_masuk_id): q.kuota - approved.get((q.program_studi_id, q.jalur_masuk_id), 0)
+        for q in ranking_in.quotas
+    }
+    ranked = ranking.rank_groups(crud.scored_applicants(db, ranking_in.weights), quotas, ranking_in.waitlist_size)
+    groups = [
+        schemas.RankingGroupOut(
+            program_studi_id=prodi,
+            jalur_masuk_id=jalur,
+            kuota=max(quotas[(prodi, jalur)], 0),
+            admitted=[schemas.RankedCalon(id=i, skor=s) for i, s in admitted],
+            waitlist=[schemas.RankedCalon(id=i, skor=s) for i, s in waitlist],
+        )
+        for (prodi, jalur), (admitted, waitlist) in ranked.items()
+    ]
+    approval = None
+    if ranking_in.approve:
+        ids = [c.id for group in groups for c in group.admitted]
+        approval = crud.approve_calon_batch(db, schemas.BatchApproveIn(ids=ids), utils.nim_allocator.allocate)
+    return schemas.RankingOut(groups=groups, approval=approval)
+
+@app.get("/api/pmb/stats")
+def admission_statistics():
+    return admission_stats.snapshot()
+
+@app.get("/api/pmb/export")
+def export_calon(
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    since: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    rows = crud.export_approved(db, since)
+    columns = list(rows.keys())
+    if format == "ndjson":
+        return StreamingResponse(utils.iter_ndjson(rows, columns), media_type="application/x-ndjson")
+    return StreamingResponse(
+        utils.iter_csv(rows, columns),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=calon_approved.csv"},
+    )
+
+@app.post("/api/pmb/{id}/documents", response_model=schemas.DokumenOut)
+def upload_document(id: int, response: Response, jenis: str = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db)):
+    if not crud.get_calon(db, id):
+        raise HTTPException(status_code=404, detail="Calon tidak ditemukan")
+    # Starlette sudah menampung upload di SpooledTemporaryFile; save hanya menyalin per chunk sambil di-hash
+    sha256, size = document_store.save(file.file)
+    dokumen, created = crud.add_dokumen(db, id, jenis, file.filename or sha256, file.content_type, sha256, size)
+    response.status_code = 201 if created else 200
+    return dokumen
+
+@app.get("/api/pmb/{id}/documents", response_model=List[schemas.DokumenOut])
+def list_documents(id: int, db: Session = Depends(get_db)):
+    return crud.list_dokumen(db, id)
+
+@app.get("/api/pmb/{id}/documents/{dokumen_id}")
+def download_document(id: int, dokumen_id: int, request: Request, db: Session = Depends(get_db)):
+    dokumen = crud.get_dokumen(db, id, dokumen_id)
+    if not dokumen:
+        raise HTTPException(status_code=404, detail="Dokumen tidak ditemukan")
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{dokumen.sha256}"',
+        "Content-Disposition": content_disposition(dokumen.filename),
+    }
+    media_type = dokumen.content_type or "application/octet-stream"
+    range_header = request.headers.get("range")
+    byte_range = None
+    if range_header:
+        try:
+            byte_range = parse_range(range_header, dokumen.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{dokumen.size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{dokumen.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(document_store.iter_range(dokumen.sha256, start, end), status_code=206, media_type=media_type, headers=headers)
+    headers["Content-Length"] = str(dokumen.size)
+    return StreamingResponse(document_store.iter_range(dokumen.sha256, 0, dokumen.size - 1), media_type=media_type, headers=headers)
+
+if ASYNC_MODE:
+    from . import async_routes
+    app.include_router(async_routes.router)
+else:
+    app.include_router(router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -39,6 +39,15 @@ class CalonMahasiswa(Base):
     program_studi = relationship("ProgramStudi")
     jalur_masuk = relationship("JalurMasuk")
 
+    __table_args__ = (
+        Index("ix_calon_status_id", "status", "id"),
+        Index("ix_calon_prodi_status_id", "program_studi_id", "status", "id"),
+        Index("ix_calon_jalur_status_id", "jalur_masuk_id", "status", "id"),
+        Index("ix_calon_created_at_id", "created_at", "id"),
+        Index("ix_calon_status_approved_at_id", "status", "approved_at", "id"),
+        Index("ix_calon_nama_lengkap", "nama_lengkap"),
+    )
+
 class NIMSequence(Base):
     __tablename__ = "nim_sequence"
     id = Column(Integer, primary_key=True, index=True)
@@ -46,3 +55,23 @@ class NIMSequence(Base):
     kode_prodi = Column(String(10), nullable=False)
     seq = Column(Integer, default=0, nullable=False)
     __table_args__ = (UniqueConstraint("tahun", "kode_prodi", name="uq_tahun_kode"),)
+
+class SkorSeleksi(Base):
+    __tablename__ = "skor_seleksi"
+    id = Column(Integer, primary_key=True, index=True)
+    calon_id = Column(Integer, ForeignKey("calon_mahasiswa.id"), nullable=False)
+    komponen = Column(String(50), nullable=False)
+    nilai = Column(Float, nullable=False)
+    __table_args__ = (UniqueConstraint("calon_id", "komponen", name="uq_calon_komponen"),)
+
+class DokumenCalon(Base):
+    __tablename__ = "dokumen_calon"
+    id = Column(Integer, primary_key=True, index=True)
+    calon_id = Column(Integer, ForeignKey("calon_mahasiswa.id"), nullable=False, index=True)
+    jenis = Column(String(50), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (UniqueConstraint("calon_id", "jenis", "sha256", name="uq_calon_jenis_sha256"),)
@@ -0,0 +1,28 @@
+import heapq
+from collections import defaultdict
+
+def top_k(scored, k: int):
+    if k <= 0:
+        return []
+    heap = []
+    for calon_id, score in scored:
+        entry = (score, -calon_id)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [(-neg_id, score) for score, neg_id in sorted(heap, reverse=True)]
+
+def rank_groups(rows, quotas, waitlist_size: int = 0):
+    groups = defaultdict(list)
+    for calon_id, program_studi_id, jalur_masuk_id, score in rows:
+        key = (program_studi_id, jalur_masuk_id)
+        if key in quotas:
+            groups[key].append((calon_id, score))
+    ranked = {}
+    waitlist_size = max(waitlist_size, 0)
+    for key, kuota in quotas.items():
+        kuota = max(kuota, 0)
+        selected = top_k(groups.get(key, ()), kuota + waitlist_size)
+        ranked[key] = (selected[:kuota], selected[kuota:])
+    return ranked
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from . import models
+from .database import SessionLocal
+
+class InvalidReferenceError(ValueError):
+    pass
+
+class ReferenceCache:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.version = 0
+        self._prodi_kode = {}
+        self._jalur_nama = {}
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self.session_factory() as db:
+            prodi_kode = dict(db.execute(select(models.ProgramStudi.id, models.ProgramStudi.kode)).all())
+            jalur_nama = dict(db.execute(select(models.JalurMasuk.id, models.JalurMasuk.nama)).all())
+        with self._lock:
+            self._prodi_kode = prodi_kode
+            self._jalur_nama = jalur_nama
+            self._stale = False
+            self.version += 1
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _ensure_fresh(self):
+        if self._stale:
+            self.refresh()
+
+    async def ensure_fresh_async(self):
+        # refresh memakai sesi sinkron; di route async dijalankan di thread agar event loop tidak tertahan
+        if self._stale:
+            await asyncio.to_thread(self.refresh)
+
+    def prodi_kode(self, program_studi_id: int):
+        self._ensure_fresh()
+        return self._prodi_kode.get(program_studi_id)
+
+    def jalur_nama(self, jalur_masuk_id: int):
+        self._ensure_fresh()
+        return self._jalur_nama.get(jalur_masuk_id)
+
+    def check_calon(self, calon_in):
+        if self.prodi_kode(calon_in.program_studi_id) is None:
+            raise InvalidReferenceError(f"program_studi_id {calon_in.program_studi_id} tidak ditemukan")
+        if self.jalur_nama(calon_in.jalur_masuk_id) is None:
+            raise InvalidReferenceError(f"jalur_masuk_id {calon_in.jalur_masuk_id} tidak ditemukan")
+
+    def snapshot(self):
+        self._ensure_fresh()
+        return {
+            "version": self.version,
+            "program_studi": self._prodi_kode,
+            "jalur_masuk": self._jalur_nama,
+        }
+
+reference_cache = ReferenceCache()
+
+def _flag_reference_change(mapper, connection, target):
+    db = object_session(target)
+    if db is not None:
+        db.info["reference_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(db):
+    if db.info.pop("reference_changed", False):
+        reference_cache.mark_stale()
+
+for _model in (models.ProgramStudi, models.JalurMasuk):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _flag_reference_change)
@@ -1,6 +1,11 @@
-from fastapi import FastAPI, HTTPException
-from models import Schedule
-from services.scheduling import detect_schedule_conflict
+import threading
+from typing import List
+from fastapi import FastAPI, HTTPException, Query
+from models import Schedule, TimetableRequest
+from services.scheduling import ScheduleIndex, CONFLICT_TYPES, sweep_conflicts
+from services.occupancy import RoomOccupancy
+from services.rescheduler import suggest_alternative
+from services.timetable import generate_timetable, TimetableError
 from services.observer import (
     ScheduleSubject, StudentObserver,
     LecturerObserver, AdminObserver
@@ -14,6 +19,15 @@ app = FastAPI()
 @app.on_event("startup")
 def startup_event():
     app.state.schedules = []
+    app.state.schedule_index = ScheduleIndex()
+    app.state.schedule_lock = threading.Lock()
+    app.state.occupancy = RoomOccupancy()
+    app.state.schedule_by_id = {}
+    subject.start_dispatcher()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    subject.stop_dispatcher()
 
 # =========================
 # OBSERVER SETUP
@@ -28,7 +42,24 @@ subject.attach(AdminObserver())
 # =========================
 @app.post("/schedule")
 def create_schedule(schedule: Schedule):
-    schedules = app.state.schedules
+    with app.state.schedule_lock:
+        _store_schedule(schedule)
+
+    subject.notify("SCHEDULE_CREATED", schedule.dict())
+
+    return {
+        "message": "Jadwal berhasil ditambahkan",
+        "data": schedule
+    }
+
+def _store_schedule(schedule):
+    index = app.state.schedule_index
+
+    if schedule.jam_mulai >= schedule.jam_selesai:
+        raise HTTPException(
+            status_code=400,
+            detail="Jam mulai harus lebih awal dari jam selesai"
+        )
 
     # 1️⃣ Cek kapasitas
     if schedule.jumlah_mahasiswa > schedule.kapasitas_ruangan:
@@ -37,23 +68,15 @@ def create_schedule(schedule: Schedule):
             detail="Kapasitas ruangan tidak cukup"
         )
 
-    # 2️⃣ Cek duplikasi
-    for existing in schedules:
-        if (
-            existing.hari == schedule.hari and
-            existing.jam_mulai == schedule.jam_mulai and
-            existing.jam_selesai == schedule.jam_selesai and
-            existing.ruangan == schedule.ruangan and
-            existing.dosen == schedule.dosen
-        ):
-            raise HTTPException(
-                status_code=409,
-                detail="Jadwal sudah ada (duplicate schedule)"
-            )
+    # 2️⃣ Cek duplikasi (hash set)
+    if index.is_duplicate(schedule):
+        raise HTTPException(
+            status_code=409,
+            detail="Jadwal sudah ada (duplicate schedule)"
+        )
 
-    # 3️⃣ CEK BENTROK (tanpa menyimpan)
-    temp_schedules = schedules + [schedule]
-    conflicts = detect_schedule_conflict(temp_schedules)
+    # 3️⃣ CEK BENTROK (tanpa menyimpan) — hanya tetangga di indeks (hari, ruangan) / (hari, dosen)
+    conflicts = index.conflicts(schedule)
 
     if conflicts:
         raise HTTPException(
@@ -65,13 +88,152 @@ def create_schedule(schedule: Schedule):
         )
 
     # 4️⃣ BARU SIMPAN JIKA AMAN
-    schedules.append(schedule)
+    _commit(schedule)
 
-    subject.notify("SCHEDULE_CREATED", schedule.dict())
+def _commit(schedule):
+    # Bitmask okupansi dibangun paling awal: bila gagal, belum ada state lain yang berubah
+    app.state.occupancy.add(schedule)
+    app.state.schedules.append(schedule)
+    app.state.schedule_index.add(schedule)
+    app.state.schedule_by_id.setdefault(schedule.id, schedule)
+
+# =========================
+# POST SCHEDULE (BULK)
+# =========================
+@app.post("/schedule/bulk")
+def create_schedules_bulk(batch: List[Schedule]):
+    with app.state.schedule_lock:
+        _store_bulk(batch)
+
+    for s in batch:
+        subject.notify("SCHEDULE_CREATED", s.dict())
 
     return {
-        "message": "Jadwal berhasil ditambahkan",
-        "data": schedule
+        "message": f"{len(batch)} jadwal berhasil ditambahkan",
+        "total": len(app.state.schedules)
+    }
+
+def _store_bulk(batch):
+    index = app.state.schedule_index
+
+    # 1️⃣ Cek jam & kapasitas
+    invalid = [s.id for s in batch if s.jam_mulai >= s.jam_selesai]
+    capacity = [s.id for s in batch if s.jumlah_mahasiswa > s.kapasitas_ruangan]
+
+    # 2️⃣ Cek duplikasi: terhadap jadwal tersimpan dan di dalam batch
+    duplicates = []
+    seen = {}
+    for s in batch:
+        key = index.duplicate_key(s)
+        if index.is_duplicate(s) or key in seen:
+            duplicates.append(s.id)
+        seen.setdefault(key, s)
+
+    # 3️⃣ CEK BENTROK: batch vs tersimpan lewat indeks, di dalam batch lewat sweep-line per hari
+    valid = [s for s in batch if s.jam_mulai < s.jam_selesai]
+    offset = len(index)
+    found = []
+    for position, s in enumerate(valid):
+        for seq, order, existing in index.conflict_pairs(s):
+            found.append((seq - 1, offset + position, order, existing, s))
+    for i, j, order in sweep_conflicts(valid):
+        found.append((offset + i, offset + j, order, valid[i], valid[j]))
+    found.sort(key=lambda item: item[:3])
+    conflicts = [
+        {"type": CONFLICT_TYPES[order], "affected": [a.id, b.id]}
+        for _, _, order, a, b in found
+    ]
+
+    if invalid or capacity or duplicates or conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Import jadwal gagal, tidak ada jadwal yang disimpan",
+                "invalid": invalid,
+                "capacity": capacity,
+                "duplicates": duplicates,
+                "conflicts": conflicts
+            }
+        )
+
+    # 4️⃣ SIMPAN SEMUA SEKALIGUS
+    for s in batch:
+        _commit(s)
+
+# =========================
+# GENERATE TIMETABLE
+# =========================
+@app.post("/schedule/generate")
+def generate_schedule(request: TimetableRequest):
+    # Jadwal yang sudah tersimpan ikut dihitung sebagai penempatan tetap
+    with app.state.schedule_lock:
+        fixed = [s.dict() for s in app.state.schedules]
+    try:
+        schedules, bentrok = generate_timetable(
+            [c.dict() for c in request.courses],
+            [r.dict() for r in request.rooms],
+            days=request.hari,
+            jam_mulai=request.jam_mulai,
+            jam_selesai=request.jam_selesai,
+            restarts=request.restarts,
+            fixed=fixed
+        )
+    except TimetableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if request.simpan:
+        if bentrok:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Solver tidak menemukan jadwal bebas bentrok, tidak ada jadwal yang disimpan",
+                    "bentrok": bentrok
+                }
+            )
+        with app.state.schedule_lock:
+            _store_bulk(schedules)
+        for s in schedules:
+            subject.notify("SCHEDULE_CREATED", s.dict())
+
+    return {
+        "message": "Jadwal berhasil dibuat" if not bentrok else "Jadwal dibuat dengan sisa bentrok",
+        "bentrok": bentrok,
+        "disimpan": request.simpan,
+        "total": len(schedules),
+        "data": schedules
+    }
+
+# =========================
+# ALTERNATIVE SLOTS
+# =========================
+@app.get("/schedule/{schedule_id}/alternatives")
+def get_alternatives(schedule_id: int, limit: int = Query(3, ge=1, le=50)):
+    schedule = app.state.schedule_by_id.get(schedule_id)
+    if schedule is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Jadwal tidak ditemukan"
+        )
+    return {
+        "schedule": schedule,
+        "alternatives": suggest_alternative(schedule, app.state.occupancy, limit)
+    }
+
+# =========================
+# NOTIFICATION METRICS
+# =========================
+@app.get("/notifications/metrics")
+def get_notification_metrics():
+    if subject.dispatcher is None:
+        return {"running": False}
+    return {"running": subject.dispatcher.running, **subject.dispatcher.metrics()}
+
+@app.get("/notifications/dead-letters")
+def get_dead_letters():
+    dead_letters = subject.dispatcher.dead_letter_list() if subject.dispatcher else []
+    return {
+        "total": len(dead_letters),
+        "data": dead_letters
     }
 
 # =========================
@@ -1,12 +1,44 @@
-from pydantic import BaseModel
+from typing import List
+from pydantic import BaseModel, Field, validator
+from services.occupancy import HARI, JAM_MULAI, JAM_SELESAI
+
+MAX_RESTARTS = 32
+JAM_MAKS = 24
 
 class Schedule(BaseModel):
     id: int
     mata_kuliah: str
     hari: str
-    jam_mulai: int
-    jam_selesai: int
+    # Urutan jam_mulai < jam_selesai dicek di endpoint agar laporan bentrok/invalid tetap sama
+    jam_mulai: int = Field(..., ge=0, lt=JAM_MAKS)
+    jam_selesai: int = Field(..., gt=0, le=JAM_MAKS)
     ruangan: str
     kapasitas_ruangan: int
     dosen: str
-    jumlah_mahasiswa: int
\ No newline at end of file
+    jumlah_mahasiswa: int
+
+class CourseOffering(BaseModel):
+    id: int
+    mata_kuliah: str
+    dosen: str
+    jumlah_mahasiswa: int
+    durasi: int = Field(2, ge=1)
+
+class Room(BaseModel):
+    ruangan: str
+    kapasitas: int
+
+class TimetableRequest(BaseModel):
+    courses: List[CourseOffering]
+    rooms: List[Room]
+    hari: List[str] = HARI
+    jam_mulai: int = Field(JAM_MULAI, ge=0, lt=JAM_MAKS)
+    jam_selesai: int = Field(JAM_SELESAI, gt=0, le=JAM_MAKS)
+    restarts: int = Field(4, ge=1, le=MAX_RESTARTS)
+    simpan: bool = False
+
+    @validator("hari")
+    def hari_not_empty(cls, hari):
+        if not hari:
+            raise ValueError("Daftar hari tidak boleh kosong")
+        return hari
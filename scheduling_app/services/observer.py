@@ -1,10 +1,36 @@
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUE_SIZE = 10000
+ENQUEUE_TIMEOUT = 0.05
+BATCH_SIZE = 500
+BATCH_WINDOW = 0.2
+WORKERS = 8
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.1
+DEAD_LETTER_SIZE = 1000
+LATENCY_WINDOW = 1000
+
 class Observer:
     def update(self, event):
         pass
 
+    def recipients(self, event):
+        # Penerima notifikasi untuk event ini; event dengan penerima sama digabung jadi satu digest
+        return ["*"]
+
+    def deliver(self, recipient, events):
+        for event in events:
+            self.update(event)
+
 class ScheduleSubject:
     def __init__(self):
         self._observers = []
+        self.dispatcher = None
 
     def attach(self, observer):
         self._observers.append(observer)
@@ -13,17 +39,265 @@ class ScheduleSubject:
         self._observers.remove(observer)
 
     def notify(self, event_type, data):
+        event = {"type": event_type, "data": data}
+        # Dengan dispatcher aktif, request hanya memasukkan event ke antrean
+        if self.dispatcher is not None and self.dispatcher.running:
+            self.dispatcher.enqueue(event)
+            return
         for obs in self._observers:
-            obs.update({"type": event_type, "data": data})
+            obs.update(event)
+
+    def start_dispatcher(self, **options):
+        self.dispatcher = NotificationDispatcher(self._observers, **options)
+        self.dispatcher.start()
+        return self.dispatcher
+
+    def stop_dispatcher(self, timeout=5):
+        if self.dispatcher is not None:
+            self.dispatcher.stop(timeout)
+
+# =========================
+# ASYNC DISPATCH
+# =========================
+class NotificationDispatcher:
+    # Antrean terbatas -> satu thread pengumpul membentuk batch -> worker pool mengirim
+    # digest per (observer, penerima) dengan retry + backoff; yang tetap gagal masuk dead-letter
+    def __init__(self, observers, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW,
+                 workers=WORKERS, max_attempts=MAX_ATTEMPTS, backoff_base=BACKOFF_BASE):
+        self.observers = observers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.workers = workers
+        self.running = False
+        self.dead_letters = deque(maxlen=DEAD_LETTER_SIZE)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pool = None
+        self._collector = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counters = dict.fromkeys(
+            ("enqueued", "dropped", "batches", "digests", "delivered", "retries", "dead_lettered"), 0
+        )
+        # Batasi digest yang menunggu worker agar antrean depan yang menahan beban (backpressure)
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def start(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="notifier")
+        self.running = True
+        self._collector = threading.Thread(target=self._collect, name="notifier-collector", daemon=True)
+        self._collector.start()
+
+    def stop(self, timeout=5):
+        # Sisa antrean tetap dikirim sebelum berhenti
+        self.running = False
+        self._collector.join(timeout)
+        self._pool.shutdown(wait=True)
+
+    def enqueue(self, event):
+        try:
+            self._queue.put((time.monotonic(), event), timeout=ENQUEUE_TIMEOUT)
+        except queue.Full:
+            self._record_dead_letter("dropped", {"event": event, "error": "Antrean notifikasi penuh", "attempts": 0})
+            return False
+        self._count("enqueued")
+        return True
+
+    def _collect(self):
+        while self.running or not self._queue.empty():
+            batch = self._next_batch()
+            if batch:
+                self._dispatch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.batch_window)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, batch):
+        digests = defaultdict(list)
+        for enqueued_at, event in batch:
+            for obs in self.observers:
+                try:
+                    recipients = list(obs.recipients(event))
+                except Exception as e:
+                    # Satu event yang rusak tidak boleh mematikan thread pengumpul
+                    self._dead_letter(obs, None, [event], e, 0)
+                    continue
+                for recipient in recipients:
+                    digests[(id(obs), recipient)].append((enqueued_at, event))
+        by_id = {id(obs): obs for obs in self.observers}
+        self._count("batches")
+        for (observer_id, recipient), items in digests.items():
+            self._slots.acquire()
+            try:
+                future = self._pool.submit(self._deliver, by_id[observer_id], recipient, items)
+            except RuntimeError as e:
+                # Pool sudah ditutup (interpreter berhenti): digest tidak hilang diam-diam
+                self._slots.release()
+                self._dead_letter(by_id[observer_id], recipient, [event for _, event in items], e, 0)
+                continue
+            with self._lock:
+                self._pending.add(future)
+            future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def _deliver(self, observer, recipient, items):
+        events = [event for _, event in items]
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                observer.deliver(recipient, events)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self._dead_letter(observer, recipient, events, e, attempt)
+                    return
+                self._count("retries")
+                # Backoff eksponensial dengan jitter
+                time.sleep(self.backoff_base * (2 ** (attempt - 1)) * (1 + random.random()))
+            else:
+                now = time.monotonic()
+                with self._lock:
+                    self._counters["digests"] += 1
+                    self._counters["delivered"] += len(items)
+                    self._latencies.extend(now - enqueued_at for enqueued_at, _ in items)
+                return
+
+    def _dead_letter(self, observer, recipient, events, error, attempts):
+        self._record_dead_letter("dead_lettered", {
+            "observer": type(observer).__name__,
+            "recipient": recipient,
+            "events": events,
+            "error": str(error),
+            "attempts": attempts
+        })
 
+    def _record_dead_letter(self, counter, entry):
+        with self._lock:
+            self._counters[counter] += 1
+            self.dead_letters.append(entry)
+
+    def dead_letter_list(self):
+        # Salinan di bawah lock: worker bisa menambah dead-letter saat endpoint membaca
+        with self._lock:
+            return list(self.dead_letters)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def drain(self, timeout=5):
+        # Tunggu sampai antrean kosong dan semua pengiriman selesai (dipakai di test)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                idle = not self._pending
+            if idle and self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+            in_flight = len(self._pending)
+            dead_letters = len(self.dead_letters)
+        latency = {}
+        if latencies:
+            latency = {
+                "avg_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2)
+            }
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "in_flight": in_flight,
+            "dead_letters": dead_letters,
+            "latency": latency,
+            **counters
+        }
+
+# =========================
+# OBSERVERS
+# =========================
 class StudentObserver(Observer):
+    def recipients(self, event):
+        mata_kuliah = event["data"].get("mata_kuliah")
+        return [f"mahasiswa:{mata_kuliah}"] if mata_kuliah else []
+
     def update(self, event):
         print(f"[EMAIL] Mahasiswa notified: {event}")
 
+    def deliver(self, recipient, events):
+        print(f"[EMAIL] {recipient}: {len(events)} perubahan jadwal {[e['data'].get('id') for e in events]}")
+
 class LecturerObserver(Observer):
+    def recipients(self, event):
+        dosen = event["data"].get("dosen")
+        return [f"dosen:{dosen}"] if dosen else []
+
     def update(self, event):
         print(f"[PUSH] Dosen notified: {event}")
 
+    def deliver(self, recipient, events):
+        print(f"[PUSH] {recipient}: {len(events)} perubahan jadwal {[e['data'].get('id') for e in events]}")
+
 class AdminObserver(Observer):
+    def recipients(self, event):
+        return ["admin"]
+
+    def update(self, event):
+        print(f"[LOG] Admin notified: {event}")
+
+    def deliver(self, recipient, events):
+        print(f"[LOG] {recipient}: {len(events)} event jadwal")
+
+class RecordingNotifier(Observer):
+    # Pengganti notifier sungguhan untuk test/lokal: menyimpan digest di memori dan bisa
+    # disetel untuk gagal beberapa kali atau lambat
+    def __init__(self, fail_times=0, delay=0.0, recipient_key=None):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.recipient_key = recipient_key
+        self.digests = []
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def recipients(self, event):
+        if self.recipient_key is None:
+            return ["*"]
+        return [str(event["data"].get(self.recipient_key))]
+
     def update(self, event):
-        print(f"[LOG] Admin notified: {event}")
\ No newline at end of file
+        self.deliver("*", [event])
+
+    def deliver(self, recipient, events):
+        with self._lock:
+            self.attempts += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError("Notifier gagal (simulasi)")
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.digests.append((recipient, list(events)))
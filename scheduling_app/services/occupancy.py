@@ -0,0 +1,45 @@
+HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu"]
+JAM_MULAI = 7
+JAM_SELESAI = 18
+
+def _mask(jam_mulai, jam_selesai):
+    # Bit ke-h menandai jam h..h+1 terpakai
+    return ((1 << (jam_selesai - jam_mulai)) - 1) << jam_mulai
+
+class RoomOccupancy:
+    # Bitmap per (ruangan, hari) dan per (dosen, hari) atas slot satu jam
+    def __init__(self):
+        self.rooms = {}
+        self.days = list(HARI)
+        self._room_bits = {}
+        self._lecturer_bits = {}
+
+    def add(self, schedule):
+        mask = _mask(schedule.jam_mulai, schedule.jam_selesai)
+        room_key = (schedule.ruangan, schedule.hari)
+        lecturer_key = (schedule.dosen, schedule.hari)
+        self._room_bits[room_key] = self._room_bits.get(room_key, 0) | mask
+        self._lecturer_bits[lecturer_key] = self._lecturer_bits.get(lecturer_key, 0) | mask
+        self.rooms[schedule.ruangan] = schedule.kapasitas_ruangan
+        if schedule.hari not in self.days:
+            self.days.append(schedule.hari)
+
+    def free_starts(self, ruangan, hari, dosen, durasi, ignore=None):
+        # Bitmask jam mulai di mana ruangan dan dosen sama-sama kosong selama `durasi` jam.
+        # `ignore` = jadwal yang sedang dipindahkan, slot lamanya dianggap kosong.
+        room_busy = self._room_bits.get((ruangan, hari), 0)
+        lecturer_busy = self._lecturer_bits.get((dosen, hari), 0)
+        if ignore is not None and ignore.hari == hari:
+            # Jadwal tersimpan tidak saling bentrok, jadi bit slot lama hanya milik jadwal itu
+            own = _mask(ignore.jam_mulai, ignore.jam_selesai)
+            if ignore.ruangan == ruangan:
+                room_busy &= ~own
+            if ignore.dosen == dosen:
+                lecturer_busy &= ~own
+        busy = room_busy | lecturer_busy
+        window = _mask(JAM_MULAI, JAM_SELESAI)
+        free = window & ~busy
+        starts = free
+        for k in range(1, durasi):
+            starts &= free >> k
+        return starts
@@ -1,13 +1,53 @@
-def suggest_alternative(conflict_schedule, available_slots):
-    suggestions = []
-    for slot in available_slots:
-        if slot["kapasitas"] >= conflict_schedule.jumlah_mahasiswa:
-            suggestions.append({
-                "hari": slot["hari"],
-                "jam": slot["jam"],
-                "ruangan": slot["ruangan"],
-                "reason": "Kapasitas cukup dan minim bentrok"
-            })
-        if len(suggestions) == 3:
+import heapq
+from services.occupancy import JAM_MULAI, JAM_SELESAI
+
+def suggest_alternative(conflict_schedule, occupancy, limit=3):
+    # Slot yang benar-benar kosong (ruangan dan dosen), diurutkan menurut kecocokan kapasitas
+    # lalu kedekatan dengan waktu semula (selisih hari + selisih jam relatif terhadap panjang hari)
+    if limit <= 0:
+        return []
+    durasi = conflict_schedule.jam_selesai - conflict_schedule.jam_mulai
+    days = occupancy.days
+    home = days.index(conflict_schedule.hari) if conflict_schedule.hari in days else 0
+    span = JAM_SELESAI - JAM_MULAI
+    rooms = sorted(
+        ((kapasitas - conflict_schedule.jumlah_mahasiswa) / kapasitas, ruangan, kapasitas)
+        for ruangan, kapasitas in occupancy.rooms.items()
+        # Ruangan berkapasitas 0 (jadwal tanpa mahasiswa) tidak punya rasio kecocokan, dilewati
+        if kapasitas > 0 and kapasitas >= conflict_schedule.jumlah_mahasiswa
+    )
+    best = []  # max-heap (skor dinegatifkan) berisi `limit` kandidat terbaik
+    for fit, ruangan, kapasitas in rooms:
+        # Ruangan diurutkan menurut fit dan geser >= 0, jadi sisa ruangan tidak mungkin lebih baik
+        if len(best) == limit and fit >= -best[0][0]:
             break
-    return suggestions
\ No newline at end of file
+        for day_index, hari in enumerate(days):
+            starts = occupancy.free_starts(ruangan, hari, conflict_schedule.dosen, durasi, ignore=conflict_schedule)
+            while starts:
+                low = starts & -starts
+                jam = low.bit_length() - 1
+                starts ^= low
+                if (hari, jam, ruangan) == (conflict_schedule.hari, conflict_schedule.jam_mulai, conflict_schedule.ruangan):
+                    continue
+                score = fit + abs(day_index - home) + abs(jam - conflict_schedule.jam_mulai) / span
+                entry = (-score, hari, jam, ruangan, kapasitas)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif score < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+    suggestions = []
+    for neg_score, hari, jam, ruangan, kapasitas in sorted(best, reverse=True):
+        suggestions.append({
+            "hari": hari,
+            "jam_mulai": jam,
+            "jam_selesai": jam + durasi,
+            "ruangan": ruangan,
+            "kapasitas": kapasitas,
+            "score": round(-neg_score, 3),
+            "reason": (
+                f"Ruangan dan dosen kosong, sisa kapasitas {kapasitas - conflict_schedule.jumlah_mahasiswa}, "
+                f"geser {abs(days.index(hari) - home)} hari {abs(jam - conflict_schedule.jam_mulai)} jam"
+            )
+        })
+    return suggestions
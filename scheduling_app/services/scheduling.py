@@ -1,3 +1,9 @@
+import bisect
+import heapq
+from collections import defaultdict
+
+CONFLICT_TYPES = ("room_conflict", "lecturer_conflict")
+
 def is_time_overlap(a_start, a_end, b_start, b_end):
     return max(a_start, b_start) < min(a_end, b_end)
 
@@ -21,4 +27,80 @@ def detect_schedule_conflict(schedules):
                         "type": "lecturer_conflict",
                         "affected": [s1.id, s2.id]
                     })
-    return conflicts
\ No newline at end of file
+    return conflicts
+
+class ScheduleIndex:
+    # Indeks interval per (hari, ruangan) dan (hari, dosen). Jadwal yang tersimpan tidak pernah
+    # saling bentrok, sehingga dalam satu kunci interval terurut menurut mulai sekaligus selesai.
+    def __init__(self):
+        self._rooms = {}
+        self._lecturers = {}
+        self._keys = set()
+        self._seq = 0
+
+    @staticmethod
+    def duplicate_key(schedule):
+        return (schedule.hari, schedule.jam_mulai, schedule.jam_selesai, schedule.ruangan, schedule.dosen)
+
+    def is_duplicate(self, schedule):
+        return self.duplicate_key(schedule) in self._keys
+
+    def conflicts(self, schedule):
+        # Urutan hasil sama dengan detect_schedule_conflict(schedules + [schedule])
+        found = sorted(self.conflict_pairs(schedule), key=lambda item: item[:2])
+        return [_conflict(order, existing, schedule) for _, order, existing in found]
+
+    def conflict_pairs(self, schedule):
+        # (urutan simpan, 0=ruangan/1=dosen, jadwal tersimpan) untuk setiap tetangga yang beririsan
+        for order, index, key in (
+            (0, self._rooms, (schedule.hari, schedule.ruangan)),
+            (1, self._lecturers, (schedule.hari, schedule.dosen)),
+        ):
+            for seq, existing in _overlapping(index.get(key), schedule.jam_mulai, schedule.jam_selesai):
+                yield seq, order, existing
+
+    def __len__(self):
+        return self._seq
+
+    def add(self, schedule):
+        self._seq += 1
+        entry = (schedule.jam_mulai, schedule.jam_selesai, self._seq, schedule)
+        bisect.insort(self._rooms.setdefault((schedule.hari, schedule.ruangan), []), entry, key=_by_start)
+        bisect.insort(self._lecturers.setdefault((schedule.hari, schedule.dosen), []), entry, key=_by_start)
+        self._keys.add(self.duplicate_key(schedule))
+
+def _by_start(entry):
+    return entry[0], entry[2]
+
+def _overlapping(entries, start, end):
+    if not entries:
+        return
+    # Interval pertama yang selesai setelah `start`; dari situ maju selama masih mulai sebelum `end`
+    i = bisect.bisect_right(entries, start, key=lambda entry: entry[1])
+    while i < len(entries) and entries[i][0] < end:
+        yield entries[i][2], entries[i][3]
+        i += 1
+
+def _conflict(order, a, b):
+    return {"type": CONFLICT_TYPES[order], "affected": [a.id, b.id]}
+
+def sweep_conflicts(schedules):
+    # Pasangan bentrok (i, j, 0=ruangan/1=dosen) dengan i < j: per hari dan per ruangan/dosen,
+    # interval diurutkan menurut jam mulai lalu di-sweep dengan heap jam selesai. O(n log n + k).
+    groups = defaultdict(list)
+    for position, schedule in enumerate(schedules):
+        groups[(0, schedule.hari, schedule.ruangan)].append(position)
+        groups[(1, schedule.hari, schedule.dosen)].append(position)
+    pairs = []
+    for (order, _, _), positions in groups.items():
+        positions.sort(key=lambda p: schedules[p].jam_mulai)
+        active = []
+        for p in positions:
+            start = schedules[p].jam_mulai
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, other in active:
+                pairs.append((min(p, other), max(p, other), order))
+            heapq.heappush(active, (schedules[p].jam_selesai, p))
+    pairs.sort()
+    return pairs
@@ -0,0 +1,233 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from models import Schedule
+from services.occupancy import HARI, JAM_MULAI, JAM_SELESAI
+
+MAX_ITERATIONS = 20000
+SAMPLE_MOVES = 60
+TABU_TENURE = 15
+
+class TimetableError(Exception):
+    pass
+
+# =========================
+# PROBLEM
+# =========================
+class _Problem:
+    # Data soal dalam bentuk indeks agar murah dikirim ke proses worker
+    def __init__(self, courses, rooms, days, jam_mulai, jam_selesai, fixed=()):
+        self.courses = courses
+        self.rooms = rooms
+        self.days = days
+        self.jam_mulai = jam_mulai
+        self.hours = jam_selesai - jam_mulai
+        lecturers = {}
+        self.lecturer = [lecturers.setdefault(c["dosen"], len(lecturers)) for c in courses]
+        self.duration = [c["durasi"] for c in courses]
+        self.domain_rooms = []
+        for c in courses:
+            if c["durasi"] < 1:
+                raise TimetableError(f"Durasi {c['mata_kuliah']} minimal 1 jam")
+            fits = [r for r, room in enumerate(rooms) if room["kapasitas"] >= c["jumlah_mahasiswa"]]
+            if not fits:
+                raise TimetableError(f"Tidak ada ruangan untuk {c['mata_kuliah']} ({c['jumlah_mahasiswa']} mahasiswa)")
+            if c["durasi"] > self.hours:
+                raise TimetableError(f"Durasi {c['mata_kuliah']} melebihi jam kuliah per hari")
+            # Ruangan paling pas di depan, dipakai saat pewarnaan greedy
+            fits.sort(key=lambda r: rooms[r]["kapasitas"])
+            self.domain_rooms.append(fits)
+        # Jadwal tersimpan jadi penempatan tetap: jam (hari, ruangan) dan (hari, dosen) yang sudah
+        # terpakai dihitung sebagai bentrok sejak awal. Bagian di luar hari/jam solver diabaikan.
+        day_index = {hari: d for d, hari in enumerate(days)}
+        room_index = {room["ruangan"]: r for r, room in enumerate(rooms)}
+        self.fixed_rooms = []
+        self.fixed_lecturers = []
+        for f in fixed:
+            day = day_index.get(f["hari"])
+            start = max(f["jam_mulai"] - jam_mulai, 0)
+            end = min(f["jam_selesai"] - jam_mulai, self.hours)
+            if day is None or start >= end:
+                continue
+            if f["ruangan"] in room_index:
+                self.fixed_rooms.append((room_index[f["ruangan"]], day, start, end))
+            if f["dosen"] in lecturers:
+                self.fixed_lecturers.append((lecturers[f["dosen"]], day, start, end))
+        self.n_lecturers = len(lecturers)
+
+# =========================
+# SEARCH STATE
+# =========================
+class _State:
+    def __init__(self, problem):
+        self.p = problem
+        n_days = len(problem.days)
+        self.room_use = [[[0] * problem.hours for _ in range(n_days)] for _ in problem.rooms]
+        self.lecturer_use = [[[0] * problem.hours for _ in range(n_days)] for _ in range(problem.n_lecturers)]
+        self.assignment = [None] * len(problem.courses)
+        self.cost = 0
+        for use, fixed in ((self.room_use, problem.fixed_rooms), (self.lecturer_use, problem.fixed_lecturers)):
+            for owner, day, start, end in fixed:
+                for h in range(start, end):
+                    use[owner][day][h] += 1
+
+    def clash(self, c, day, start, room):
+        # Jam-bentrok yang ditimbulkan kursus c di posisi ini terhadap kursus lain
+        rooms = self.room_use[room][day]
+        lecturers = self.lecturer_use[self.p.lecturer[c]][day]
+        total = 0
+        for h in range(start, start + self.p.duration[c]):
+            total += rooms[h] + lecturers[h]
+        return total
+
+    def _apply(self, c, placement, sign):
+        day, start, room = placement
+        rooms = self.room_use[room][day]
+        lecturers = self.lecturer_use[self.p.lecturer[c]][day]
+        for h in range(start, start + self.p.duration[c]):
+            rooms[h] += sign
+            lecturers[h] += sign
+
+    def place(self, c, placement):
+        self.cost += self.clash(c, *placement)
+        self._apply(c, placement, 1)
+        self.assignment[c] = placement
+
+    def unplace(self, c):
+        placement = self.assignment[c]
+        self._apply(c, placement, -1)
+        self.cost -= self.clash(c, *placement)
+        self.assignment[c] = None
+        return placement
+
+    def conflicted(self):
+        result = []
+        for c, placement in enumerate(self.assignment):
+            self._apply(c, placement, -1)
+            if self.clash(c, *placement):
+                result.append(c)
+            self._apply(c, placement, 1)
+        return result
+
+def _random_placement(problem, c, rng):
+    return (
+        rng.randrange(len(problem.days)),
+        rng.randrange(problem.hours - problem.duration[c] + 1),
+        rng.choice(problem.domain_rooms[c]),
+    )
+
+# =========================
+# PHASE 1: GREEDY COLORING
+# =========================
+def _greedy(problem, rng):
+    # Kursus tersulit dulu (dosen paling sibuk, ruangan paling sedikit, durasi terpanjang);
+    # tiap kursus mendapat "warna" (hari, jam, ruangan) pertama yang bebas bentrok
+    load = [0] * problem.n_lecturers
+    for c, lecturer in enumerate(problem.lecturer):
+        load[lecturer] += problem.duration[c]
+    order = sorted(
+        range(len(problem.courses)),
+        key=lambda c: (-load[problem.lecturer[c]], len(problem.domain_rooms[c]), -problem.duration[c], rng.random()),
+    )
+    state = _State(problem)
+    days = list(range(len(problem.days)))
+    for c in order:
+        rng.shuffle(days)
+        best = None
+        for day in days:
+            for start in range(problem.hours - problem.duration[c] + 1):
+                for room in problem.domain_rooms[c]:
+                    clash = state.clash(c, day, start, room)
+                    if best is None or clash < best[0]:
+                        best = (clash, (day, start, room))
+                    if clash == 0:
+                        break
+                if best[0] == 0:
+                    break
+            if best[0] == 0:
+                break
+        state.place(c, best[1])
+    return state
+
+# =========================
+# PHASE 2: TABU SEARCH
+# =========================
+def _tabu(state, rng, max_iterations):
+    problem = state.p
+    tabu = {}
+    best_cost = state.cost
+    best_assignment = list(state.assignment)
+    conflicted = state.conflicted()
+    for iteration in range(max_iterations):
+        if state.cost == 0:
+            break
+        if iteration % 50 == 0:
+            conflicted = state.conflicted()
+        c = rng.choice(conflicted)
+        old = state.unplace(c)
+        old_clash = state.clash(c, *old)
+        move = None
+        for _ in range(SAMPLE_MOVES):
+            placement = _random_placement(problem, c, rng)
+            delta = state.clash(c, *placement) - old_clash
+            # Aspirasi: langkah tabu tetap boleh bila menghasilkan solusi terbaik baru
+            if tabu.get((c, placement), -1) >= iteration and state.cost + old_clash + delta >= best_cost:
+                continue
+            if move is None or delta < move[0]:
+                move = (delta, placement)
+        placement = move[1] if move is not None else old
+        state.place(c, placement)
+        if placement != old:
+            tabu[(c, old)] = iteration + TABU_TENURE
+        if state.cost < best_cost:
+            best_cost = state.cost
+            best_assignment = list(state.assignment)
+            conflicted = state.conflicted()
+    return best_cost, best_assignment
+
+def _run(problem, seed, max_iterations):
+    rng = random.Random(seed)
+    state = _greedy(problem, rng)
+    cost, assignment = _tabu(state, rng, max_iterations)
+    # Sisa kapasitas yang terbuang sebagai pembanding antar-restart dengan bentrok sama
+    slack = sum(
+        problem.rooms[room]["kapasitas"] - problem.courses[c]["jumlah_mahasiswa"]
+        for c, (_, _, room) in enumerate(assignment)
+    )
+    return cost, slack, seed, assignment
+
+# =========================
+# PUBLIC API
+# =========================
+def generate_timetable(courses, rooms, days=HARI, jam_mulai=JAM_MULAI, jam_selesai=JAM_SELESAI,
+                       restarts=4, workers=None, max_iterations=MAX_ITERATIONS, seed=0, fixed=()):
+    # courses: [{id, mata_kuliah, dosen, jumlah_mahasiswa, durasi}], rooms: [{ruangan, kapasitas}]
+    # fixed: jadwal yang sudah tersimpan [{hari, jam_mulai, jam_selesai, ruangan, dosen}], tidak dipindah
+    # Hasil: (list Schedule, jumlah jam bentrok tersisa); 0 berarti jadwal bebas bentrok
+    if not courses:
+        return [], 0
+    days = list(dict.fromkeys(days))
+    if not days:
+        raise TimetableError("Daftar hari tidak boleh kosong")
+    problem = _Problem(courses, rooms, days, jam_mulai, jam_selesai, fixed)
+    seeds = [seed + i for i in range(max(1, restarts))]
+    if len(seeds) == 1 or workers == 1:
+        results = [_run(problem, s, max_iterations) for s in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, [problem] * len(seeds), seeds, [max_iterations] * len(seeds)))
+    cost, _, _, assignment = min(results)
+
+    schedules = []
+    for c, (day, start, room) in zip(courses, assignment):
+        schedules.append(Schedule(
+            id=c["id"],
+            mata_kuliah=c["mata_kuliah"],
+            hari=problem.days[day],
+            jam_mulai=jam_mulai + start,
+            jam_selesai=jam_mulai + start + c["durasi"],
+            ruangan=rooms[room]["ruangan"],
+            kapasitas_ruangan=rooms[room]["kapasitas"],
+            dosen=c["dosen"],
+            jumlah_mahasiswa=c["jumlah_mahasiswa"]
+        ))
+    return schedules, cost
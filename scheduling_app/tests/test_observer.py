@@ -0,0 +1,92 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.observer import NotificationDispatcher, RecordingNotifier
+
+
+def make_dispatcher(*observers, **options):
+    options = {"batch_window": 0.05, "backoff_base": 0.001, **options}
+    dispatcher = NotificationDispatcher(list(observers), **options)
+    dispatcher.start()
+    return dispatcher
+
+
+def event(schedule_id, dosen="D1"):
+    return {"type": "SCHEDULE_CREATED", "data": {"id": schedule_id, "dosen": dosen}}
+
+
+def test_retries_with_backoff_until_delivered():
+    notifier = RecordingNotifier(fail_times=2)
+    dispatcher = make_dispatcher(notifier, max_attempts=4)
+    dispatcher.enqueue(event(1))
+    assert dispatcher.drain()
+    dispatcher.stop()
+    assert notifier.attempts == 3
+    assert notifier.digests == [("*", [event(1)])]
+    metrics = dispatcher.metrics()
+    assert metrics["retries"] == 2 and metrics["delivered"] == 1 and metrics["dead_lettered"] == 0
+
+
+def test_dead_letters_after_max_attempts():
+    notifier = RecordingNotifier(fail_times=10)
+    dispatcher = make_dispatcher(notifier, max_attempts=3)
+    dispatcher.enqueue(event(1))
+    assert dispatcher.drain()
+    dispatcher.stop()
+    assert notifier.attempts == 3 and notifier.digests == []
+    [dead] = dispatcher.dead_letter_list()
+    assert dead["observer"] == "RecordingNotifier" and dead["attempts"] == 3 and dead["events"] == [event(1)]
+    assert dispatcher.metrics()["dead_lettered"] == 1
+
+
+def test_full_queue_drops_into_dead_letters():
+    # Tanpa start(): tidak ada pengumpul yang mengosongkan antrean
+    dispatcher = NotificationDispatcher([RecordingNotifier()], queue_size=1)
+    assert dispatcher.enqueue(event(1))
+    assert not dispatcher.enqueue(event(2))
+    assert dispatcher.dead_letter_list() == [{"event": event(2), "error": "Antrean notifikasi penuh", "attempts": 0}]
+    assert dispatcher.metrics()["dropped"] == 1
+
+
+def test_groups_digest_per_recipient():
+    notifier = RecordingNotifier(recipient_key="dosen")
+    dispatcher = make_dispatcher(notifier, batch_window=0.5)
+    for i in range(5):
+        dispatcher.enqueue(event(i, "A"))
+    for i in range(5, 8):
+        dispatcher.enqueue(event(i, "B"))
+    assert dispatcher.drain()
+    dispatcher.stop()
+    digests = {recipient: [e["data"]["id"] for e in events] for recipient, events in notifier.digests}
+    assert digests == {"A": [0, 1, 2, 3, 4], "B": [5, 6, 7]}
+    assert dispatcher.metrics()["digests"] == 2
+
+
+def test_recipient_error_is_dead_lettered_and_collector_keeps_running():
+    class PickyNotifier(RecordingNotifier):
+        def recipients(self, event):
+            if event["data"]["id"] == 1:
+                raise ValueError("penerima tidak dikenal")
+            return super().recipients(event)
+
+    notifier = PickyNotifier()
+    dispatcher = make_dispatcher(notifier)
+    dispatcher.enqueue(event(1))
+    assert dispatcher.drain()
+    dispatcher.enqueue(event(2))
+    assert dispatcher.drain()
+    dispatcher.stop()
+    assert notifier.digests == [("*", [event(2)])]
+    [dead] = dispatcher.dead_letter_list()
+    assert dead["events"] == [event(1)] and dead["recipient"] is None and "penerima" in dead["error"]
+
+
+def test_stop_delivers_remaining_queue():
+    notifier = RecordingNotifier(delay=0.01, recipient_key="id")
+    dispatcher = make_dispatcher(notifier, workers=2)
+    for i in range(20):
+        dispatcher.enqueue(event(i))
+    dispatcher.stop()
+    assert sorted(int(recipient) for recipient, _ in notifier.digests) == list(range(20))
+    assert dispatcher.metrics()["in_flight"] == 0
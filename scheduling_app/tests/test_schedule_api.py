@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import app
+from models import Schedule
+from services.scheduling import detect_schedule_conflict
+
+
+@pytest.fixture
+def client():
+    # Startup mengosongkan state, jadi setiap test mulai dari penyimpanan kosong
+    with TestClient(app) as client:
+        yield client
+
+
+def schedule(id, hari="Senin", jam_mulai=8, jam_selesai=10, ruangan="R1", dosen="D1", **overrides):
+    return {
+        "id": id, "mata_kuliah": f"MK{id}", "hari": hari, "jam_mulai": jam_mulai, "jam_selesai": jam_selesai,
+        "ruangan": ruangan, "kapasitas_ruangan": 40, "dosen": dosen, "jumlah_mahasiswa": 30, **overrides,
+    }
+
+
+@pytest.mark.parametrize("jam_mulai, jam_selesai", [(-1, 2), (8, 25), (24, 26)])
+def test_out_of_range_hours_are_rejected_before_storing(client, jam_mulai, jam_selesai):
+    response = client.post("/schedule", json=schedule(1, jam_mulai=jam_mulai, jam_selesai=jam_selesai))
+    assert response.status_code == 422
+    assert client.get("/schedule").json()["total"] == 0
+    assert client.get("/schedule/1/alternatives").status_code == 404
+
+
+def test_reversed_hours_keep_existing_error(client):
+    response = client.post("/schedule", json=schedule(1, jam_mulai=10, jam_selesai=8))
+    assert response.status_code == 400
+
+
+def test_clean_bulk_import_stores_everything(client):
+    client.post("/schedule", json=schedule(1))
+    batch = [schedule(2, jam_mulai=10, jam_selesai=12), schedule(3, ruangan="R2", dosen="D2"), schedule(4, hari="Selasa")]
+    response = client.post("/schedule/bulk", json=batch)
+    assert response.status_code == 200
+    assert [s["id"] for s in client.get("/schedule").json()["data"]] == [1, 2, 3, 4]
+    assert client.get("/schedule/4/alternatives").status_code == 200
+
+
+def test_failed_bulk_import_stores_nothing(client):
+    stored = [schedule(1), schedule(2, ruangan="R2", dosen="D2")]
+    client.post("/schedule/bulk", json=stored)
+    batch = [
+        schedule(3, hari="Selasa"),                          # bersih
+        schedule(4, jam_mulai=9, jam_selesai=11),            # bentrok ruangan + dosen dengan 1
+        schedule(5, jam_mulai=9, jam_selesai=11, ruangan="R3", dosen="D2"),  # bentrok dosen dengan 2
+        schedule(6, hari="Selasa", jam_mulai=9, jam_selesai=11),  # bentrok dengan 3 di dalam batch
+        schedule(7, jam_mulai=12, jam_selesai=11),           # jam terbalik
+        schedule(8, ruangan="R9", kapasitas_ruangan=10),      # kapasitas kurang
+    ]
+    response = client.post("/schedule/bulk", json=batch)
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["invalid"] == [7] and detail["capacity"] == [8] and detail["duplicates"] == []
+    valid = [Schedule(**s) for s in stored + batch if s["jam_mulai"] < s["jam_selesai"]]
+    assert detail["conflicts"] == detect_schedule_conflict(valid)
+    assert [s["id"] for s in client.get("/schedule").json()["data"]] == [1, 2]
+    assert client.get("/schedule/3/alternatives").status_code == 404
+
+
+def _generate(client, courses, **options):
+    rooms = [{"ruangan": "R1", "kapasitas": 40}, {"ruangan": "R2", "kapasitas": 40}]
+    return client.post("/schedule/generate", json={"courses": courses, "rooms": rooms, "restarts": 1, **options})
+
+
+def _courses(start_id, n):
+    return [
+        {"id": start_id + i, "mata_kuliah": f"MK{start_id + i}", "dosen": f"D{i % 3}", "jumlah_mahasiswa": 30, "durasi": 2}
+        for i in range(n)
+    ]
+
+
+def test_generate_with_simpan_stores_all_and_respects_stored_schedules(client):
+    client.post("/schedule", json=schedule(100, hari="Senin", jam_mulai=7, jam_selesai=18, dosen="D0"))
+    response = _generate(client, _courses(1, 8), simpan=True, hari=["Senin", "Selasa"])
+    assert response.status_code == 200
+    assert response.json()["bentrok"] == 0 and response.json()["disimpan"] is True
+    stored = [Schedule(**s) for s in client.get("/schedule").json()["data"]]
+    assert sorted(s.id for s in stored) == [1, 2, 3, 4, 5, 6, 7, 8, 100]
+    assert detect_schedule_conflict(stored) == []
+
+
+def test_generate_with_simpan_stores_nothing_when_clashes_remain(client):
+    # 2 ruangan x 1 hari x 11 jam tidak cukup untuk 12 kelas 2 jam
+    response = _generate(client, _courses(1, 12), simpan=True, hari=["Senin"])
+    assert response.status_code == 409
+    assert response.json()["detail"]["bentrok"] > 0
+    assert client.get("/schedule").json()["total"] == 0
+
+
+def test_generate_rejects_invalid_request(client):
+    assert _generate(client, _courses(1, 1), hari=[]).status_code == 422
+    assert _generate(client, _courses(1, 1), restarts=0).status_code == 422
+    assert _generate(client, [dict(_courses(1, 1)[0], durasi=0)]).status_code == 422
+    assert _generate(client, [dict(_courses(1, 1)[0], jumlah_mahasiswa=500)]).status_code == 400
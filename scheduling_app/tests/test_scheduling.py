@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models import Schedule
+from services.scheduling import CONFLICT_TYPES, ScheduleIndex, detect_schedule_conflict, sweep_conflicts
+
+
+def random_schedule(rng, id):
+    jam_mulai = rng.randrange(7, 17)
+    return Schedule(
+        id=id,
+        mata_kuliah=f"MK{id}",
+        hari=rng.choice(["Senin", "Selasa"]),
+        jam_mulai=jam_mulai,
+        jam_selesai=min(jam_mulai + rng.randint(1, 3), 18),
+        ruangan=f"R{rng.randrange(4)}",
+        kapasitas_ruangan=40,
+        dosen=f"D{rng.randrange(5)}",
+        jumlah_mahasiswa=30,
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_index_conflicts_match_pairwise_detection(seed):
+    rng = random.Random(seed)
+    index = ScheduleIndex()
+    stored = []
+    for id in range(200):
+        schedule = random_schedule(rng, id)
+        # Dibandingkan dengan versi O(n²) terhadap semua jadwal tersimpan + kandidat
+        assert index.conflicts(schedule) == detect_schedule_conflict(stored + [schedule])
+        if not index.conflicts(schedule):
+            index.add(schedule)
+            stored.append(schedule)
+    assert len(index) == len(stored) > 10
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_conflicts_match_pairwise_detection(seed):
+    rng = random.Random(seed)
+    schedules = [random_schedule(rng, id) for id in range(rng.randint(0, 80))]
+    swept = [
+        {"type": CONFLICT_TYPES[order], "affected": [schedules[i].id, schedules[j].id]}
+        for i, j, order in sweep_conflicts(schedules)
+    ]
+    assert swept == detect_schedule_conflict(schedules)
@@ -0,0 +1,59 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models import Schedule
+from services.scheduling import detect_schedule_conflict
+from services.timetable import TimetableError, generate_timetable
+
+ROOMS = [{"ruangan": "R1", "kapasitas": 40}, {"ruangan": "R2", "kapasitas": 40}, {"ruangan": "Aula", "kapasitas": 120}]
+
+
+def offerings(n, start_id=1, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"id": start_id + i, "mata_kuliah": f"MK{start_id + i}", "dosen": f"D{rng.randrange(6)}",
+         "jumlah_mahasiswa": rng.choice([25, 35, 80]), "durasi": rng.choice([1, 2, 3])}
+        for i in range(n)
+    ]
+
+
+def test_feasible_instance_is_clash_free_around_fixed_schedules():
+    fixed = [
+        Schedule(id=900, mata_kuliah="Tetap", hari="Senin", jam_mulai=7, jam_selesai=12, ruangan="Aula",
+                 kapasitas_ruangan=120, dosen="D0", jumlah_mahasiswa=100),
+        Schedule(id=901, mata_kuliah="Tetap", hari="Selasa", jam_mulai=13, jam_selesai=16, ruangan="R1",
+                 kapasitas_ruangan=40, dosen="Luar", jumlah_mahasiswa=30),
+    ]
+    courses = offerings(30)
+    schedules, cost = generate_timetable(
+        courses, ROOMS, days=["Senin", "Selasa", "Rabu"], restarts=1, workers=1, fixed=[s.dict() for s in fixed]
+    )
+    assert cost == 0
+    assert detect_schedule_conflict(fixed + schedules) == []
+    by_id = {c["id"]: c for c in courses}
+    for s in schedules:
+        assert s.jumlah_mahasiswa <= s.kapasitas_ruangan
+        assert s.jam_selesai - s.jam_mulai == by_id[s.id]["durasi"]
+        assert 7 <= s.jam_mulai and s.jam_selesai <= 18
+
+
+def test_course_without_fitting_room_is_rejected():
+    course = dict(offerings(1)[0], jumlah_mahasiswa=500)
+    with pytest.raises(TimetableError, match="Tidak ada ruangan"):
+        generate_timetable([course], ROOMS, workers=1)
+
+
+@pytest.mark.parametrize("durasi, message", [(12, "melebihi jam kuliah"), (0, "minimal 1 jam")])
+def test_invalid_duration_is_rejected(durasi, message):
+    course = dict(offerings(1)[0], durasi=durasi)
+    with pytest.raises(TimetableError, match=message):
+        generate_timetable([course], ROOMS, workers=1)
+
+
+def test_empty_day_list_is_rejected():
+    with pytest.raises(TimetableError):
+        generate_timetable(offerings(1), ROOMS, days=[], workers=1)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import Dict, List, Optional
 from datetime import date, datetime
 import re
 
@@ -41,3 +41,71 @@ class CalonOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: str
+    id: Optional[int] = None
+    email: Optional[str] = None
+    detail: Optional[str] = None
+
+class BulkRegisterOut(BaseModel):
+    created: int
+    duplicate: int
+    invalid: int
+    results: List[BulkRowResult]
+
+class BatchApproveIn(BaseModel):
+    ids: Optional[List[int]] = None
+    program_studi_id: Optional[int] = None
+    jalur_masuk_id: Optional[int] = None
+    status: str = "pending"
+
+class BatchApproveOut(BaseModel):
+    approved: List[int]
+    already_approved: List[int]
+    not_found: List[int]
+
+class SkorIn(BaseModel):
+    calon_id: int
+    komponen: str
+    nilai: float
+
+class KuotaIn(BaseModel):
+    program_studi_id: int
+    jalur_masuk_id: int
+    kuota: int = Field(..., ge=0)
+
+class RankingIn(BaseModel):
+    weights: Dict[str, float]
+    quotas: List[KuotaIn]
+    waitlist_size: int = Field(0, ge=0)
+    approve: bool = False
+
+class RankedCalon(BaseModel):
+    id: int
+    skor: float
+
+class RankingGroupOut(BaseModel):
+    program_studi_id: int
+    jalur_masuk_id: int
+    kuota: int
+    admitted: List[RankedCalon]
+    waitlist: List[RankedCalon]
+
+class RankingOut(BaseModel):
+    groups: List[RankingGroupOut]
+    approval: Optional[BatchApproveOut] = None
+
+class DokumenOut(BaseModel):
+    id: int
+    calon_id: int
+    jenis: str
+    filename: str
+    content_type: Optional[str]
+    sha256: str
+    size: int
+    created_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,76 @@
+import threading
+from collections import Counter
+from sqlalchemy import func, select
+from . import models
+from .database import SessionLocal
+
+class AdmissionStats:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._counts = Counter()
+        self._by_status = Counter()
+        self._by_prodi = Counter()
+        self._by_jalur = Counter()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def rebuild(self):
+        query = select(
+            models.CalonMahasiswa.program_studi_id,
+            models.CalonMahasiswa.jalur_masuk_id,
+            models.CalonMahasiswa.status,
+            func.count(),
+        ).group_by(
+            models.CalonMahasiswa.program_studi_id,
+            models.CalonMahasiswa.jalur_masuk_id,
+            models.CalonMahasiswa.status,
+        )
+        with self.session_factory() as db:
+            rows = db.execute(query).all()
+        with self._lock:
+            self._counts.clear()
+            self._by_status.clear()
+            self._by_prodi.clear()
+            self._by_jalur.clear()
+            for prodi, jalur, status, n in rows:
+                self._add(prodi, jalur, models.StatusEnum(status), n)
+            self._loaded = True
+
+    def record_created(self, program_studi_id: int, jalur_masuk_id: int, n: int = 1):
+        with self._lock:
+            self._add(program_studi_id, jalur_masuk_id, models.StatusEnum.pending, n)
+
+    def record_status_change(self, program_studi_id: int, jalur_masuk_id: int, old_status, new_status, n: int = 1):
+        with self._lock:
+            self._add(program_studi_id, jalur_masuk_id, models.StatusEnum(old_status), -n)
+            self._add(program_studi_id, jalur_masuk_id, models.StatusEnum(new_status), n)
+
+    def _add(self, prodi, jalur, status, n):
+        self._counts[(prodi, jalur, status)] += n
+        self._by_status[status] += n
+        self._by_prodi[(prodi, status)] += n
+        self._by_jalur[(jalur, status)] += n
+
+    def snapshot(self):
+        if not self._loaded:
+            self.rebuild()
+        with self._lock:
+            return {
+                "total": sum(self._by_status.values()),
+                "by_status": {status.value: n for status, n in self._by_status.items() if n},
+                "by_prodi": _nest(self._by_prodi),
+                "by_jalur": _nest(self._by_jalur),
+                "by_prodi_jalur": [
+                    {"program_studi_id": prodi, "jalur_masuk_id": jalur, "status": status.value, "count": n}
+                    for (prodi, jalur, status), n in self._counts.items() if n
+                ],
+            }
+
+def _nest(counter):
+    nested = {}
+    for (key, status), n in counter.items():
+        if n:
+            nested.setdefault(key, {})[status.value] = n
+    return nested
+
+admission_stats = AdmissionStats()
@@ -0,0 +1,73 @@
+import importlib
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(ROOT)
+
+# Engine dan document store dibuat saat modul diimpor, jadi env harus siap sebelum test mana pun mengimpor paket
+_tmp = tempfile.mkdtemp(prefix="pmb-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'pmb.db')}"
+os.environ["DOCUMENT_STORAGE_DIR"] = os.path.join(_tmp, "documents")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("PMB_DB_MODE", None)
+sys.path.insert(0, os.path.dirname(ROOT))
+
+_kode = itertools.count(100)
+
+
+def pmb_module(name):
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(pmb_module("main").app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    session = pmb_module("database").SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def group(db):
+    # Program studi + jalur baru per test, supaya kuota dan NIM tidak tercampur antar-test
+    models = pmb_module("models")
+    n = next(_kode)
+    prodi = models.ProgramStudi(kode=str(n), nama=f"Prodi {n}")
+    jalur = models.JalurMasuk(nama=f"Jalur {n}")
+    db.add_all([prodi, jalur])
+    db.commit()
+    return prodi.id, jalur.id, prodi.kode
+
+
+@pytest.fixture
+def register(client, group):
+    counter = itertools.count()
+
+    def register(**overrides):
+        i = next(counter)
+        payload = {
+            "nama_lengkap": f"Calon {group[0]}-{i}",
+            "email": f"calon{group[0]}-{i}@example.com",
+            "phone": "081234567890",
+            "program_studi_id": group[0],
+            "jalur_masuk_id": group[1],
+            **overrides,
+        }
+        response = client.post("/api/pmb/register", json=payload)
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+
+    return register
@@ -0,0 +1,43 @@
+from conftest import pmb_module
+
+crud = pmb_module("crud")
+database = pmb_module("database")
+schemas = pmb_module("schemas")
+utils = pmb_module("utils")
+admission_stats = pmb_module("stats").admission_stats
+
+
+def _counts(prodi):
+    return admission_stats.snapshot()["by_prodi"].get(prodi, {})
+
+
+def test_overlapping_batch_approvals_do_not_overwrite_each_other(client, db, group, register):
+    prodi = group[0]
+    ids = [register() for _ in range(3)]
+    batch = schemas.BatchApproveIn(ids=ids)
+    first = {}
+
+    def nim_callable(session_db, tahun, kode_prodi, count):
+        # Batch kedua sudah membaca baris sebagai pending; batch pertama selesai di sela-selanya
+        if not first:
+            with database.SessionLocal() as other:
+                first["result"] = crud.approve_calon_batch(other, batch, utils.nim_allocator.allocate)
+        return utils.nim_allocator.allocate(session_db, tahun, kode_prodi, count)
+
+    second = crud.approve_calon_batch(db, batch, nim_callable)
+    assert first["result"].approved == ids
+    assert second.approved == [] and second.already_approved == ids
+
+    nims = {c["id"]: c["nim"] for c in (client.get(f"/api/pmb/status/{i}").json() for i in ids)}
+    with database.SessionLocal() as fresh:
+        stored = {i: crud.get_calon(fresh, i).nim for i in ids}
+    assert stored == nims and len(set(nims.values())) == 3
+    assert _counts(prodi) == {"approved": 3}
+
+
+def test_batch_approve_reports_already_approved(client, group, register):
+    ids = [register() for _ in range(2)]
+    assert client.put(f"/api/pmb/approve/{ids[0]}").status_code == 200
+    response = client.put("/api/pmb/approve", json={"ids": ids + [10 ** 9]})
+    assert response.json() == {"approved": [ids[1]], "already_approved": [ids[0]], "not_found": [10 ** 9]}
+    assert _counts(group[0]) == {"approved": 2}
@@ -0,0 +1,34 @@
+from conftest import pmb_module
+
+cache = pmb_module("cache")
+crud = pmb_module("crud")
+database = pmb_module("database")
+utils = pmb_module("utils")
+
+
+def test_set_is_skipped_when_key_was_invalidated_after_read():
+    ttl_cache = cache.TTLCache()
+    generation = ttl_cache.generation(1)
+    ttl_cache.invalidate(1)
+    assert ttl_cache.set(1, "basi", generation) is False
+    assert ttl_cache.get(1) is None
+    assert ttl_cache.set(1, "baru", ttl_cache.generation(1)) is True
+    assert ttl_cache.get(1) == "baru"
+
+
+def test_status_does_not_cache_row_read_before_concurrent_approval(client, register, monkeypatch):
+    calon_id = register()
+    cache.calon_cache.invalidate(calon_id)
+    get_calon = crud.get_calon
+
+    def read_then_approve(db, id):
+        # Baris terbaca masih pending, lalu approve commit + invalidate sebelum hasilnya di-cache
+        calon = get_calon(db, id)
+        monkeypatch.setattr(crud, "get_calon", get_calon)
+        with database.SessionLocal() as other:
+            crud.approve_calon(other, id, utils.generate_nim)
+        return calon
+
+    monkeypatch.setattr(crud, "get_calon", read_then_approve)
+    assert client.get(f"/api/pmb/status/{calon_id}").json()["status"] == "pending"
+    assert client.get(f"/api/pmb/status/{calon_id}").json()["status"] == "approved"
@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import pmb_module
+
+database = pmb_module("database")
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./pmb.db", "sqlite+aiosqlite:///./pmb.db"),
+    ("postgresql://pmb:rahasia@db:5432/pmb", "postgresql+asyncpg://pmb:rahasia@db:5432/pmb"),
+    ("postgresql+psycopg2://pmb@db/pmb", "postgresql+asyncpg://pmb@db/pmb"),
+])
+def test_async_url_follows_database_url(url, expected):
+    assert database._resolve_async_url(url) == expected
+
+
+def test_explicit_async_url_must_point_to_same_database():
+    url = "postgresql://pmb@db/pmb"
+    assert database._resolve_async_url(url, "postgresql+asyncpg://pmb@db/pmb") == "postgresql+asyncpg://pmb@db/pmb"
+    with pytest.raises(RuntimeError):
+        database._resolve_async_url(url, "postgresql+asyncpg://pmb@db/lain")
+    with pytest.raises(RuntimeError):
+        database._resolve_async_url("sqlite:///./a.db", "sqlite+aiosqlite:///./b.db")
@@ -0,0 +1,62 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+documents = importlib.import_module(f"{os.path.basename(ROOT)}.documents")
+
+
+def test_content_disposition_escapes_client_filename():
+    header = documents.content_disposition('rapor "final"\r\nX-Evil: 1 é.pdf')
+    assert "\r" not in header and "\n" not in header
+    assert header.isascii()
+    assert header.startswith('attachment; filename="rapor _final___X-Evil: 1 _.pdf"')
+    assert header.endswith("filename*=UTF-8''rapor%20%22final%22%0D%0AX-Evil%3A%201%20%C3%A9.pdf")
+
+
+def test_parse_range_single_ranges():
+    assert documents.parse_range("bytes=0-1", 10) == (0, 1)
+    assert documents.parse_range("bytes=4-", 10) == (4, 9)
+    assert documents.parse_range("bytes=5-100", 10) == (5, 9)
+    assert documents.parse_range("bytes=-3", 10) == (7, 9)
+    assert documents.parse_range("bytes=-30", 10) == (0, 9)
+
+
+def test_parse_range_ignores_unsupported_headers():
+    for header in ("bytes=0-1,5-6", "bytes=", "bytes=-", "bytes=5-2", "items=0-1", "garbage"):
+        assert documents.parse_range(header, 10) is None, header
+
+
+def test_parse_range_unsatisfiable():
+    for header, size in (("bytes=10-", 10), ("bytes=10-20", 10), ("bytes=-0", 10), ("bytes=-5", 0), ("bytes=0-", 0)):
+        with pytest.raises(documents.RangeNotSatisfiable):
+            documents.parse_range(header, size)
+
+
+def test_download_range_handling(client, register):
+    calon_id = register()
+    body = b"0123456789"
+    uploaded = client.post(
+        f"/api/pmb/{calon_id}/documents",
+        data={"jenis": "rapor"},
+        files={"file": ("rapor.pdf", body, "application/pdf")},
+    )
+    url = f"/api/pmb/{calon_id}/documents/{uploaded.json()['id']}"
+
+    partial = client.get(url, headers={"Range": "bytes=2-4"})
+    assert partial.status_code == 206
+    assert partial.content == b"234"
+    assert partial.headers["content-range"] == "bytes 2-4/10"
+
+    for header in ("bytes=0-1,5-6", "garbage"):
+        full = client.get(url, headers={"Range": header})
+        assert full.status_code == 200
+        assert full.content == body
+        assert "content-range" not in full.headers
+
+    unsatisfiable = client.get(url, headers={"Range": "bytes=10-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */10"
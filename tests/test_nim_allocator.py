@@ -0,0 +1,65 @@
+import itertools
+import threading
+
+from conftest import pmb_module
+
+database = pmb_module("database")
+models = pmb_module("models")
+utils = pmb_module("utils")
+
+_kode = itertools.count(500)
+
+
+def _fresh_kode():
+    # Setiap test memakai (tahun, kode) sendiri agar urutan NIM tidak saling memengaruhi
+    return str(next(_kode))
+
+
+def _high_water(tahun, kode):
+    with database.SessionLocal() as db:
+        return db.scalar(utils._select_seq(tahun, kode))
+
+
+def test_nim_format_is_unchanged(db):
+    kode = _fresh_kode()
+    allocator = utils.NIMAllocator(block_size=5)
+    assert allocator.allocate(db, 2026, kode, 2) == [f"2026{kode}-0001", f"2026{kode}-0002"]
+    assert utils.NIMAllocator().allocate(db, 2026, "7")[0].startswith("2026007-")
+
+
+def test_concurrent_allocations_are_unique(client):
+    kode = _fresh_kode()
+    # Dua "proses" (allocator terpisah), masing-masing dipakai beberapa thread dengan sesi sendiri
+    allocators = [utils.NIMAllocator(block_size=3), utils.NIMAllocator(block_size=4)]
+    results, errors = [], []
+    start = threading.Barrier(8)
+
+    def worker(allocator):
+        start.wait()
+        try:
+            for count in (1, 2, 1, 3, 1):
+                with database.SessionLocal() as db:
+                    results.extend(allocator.allocate(db, 2026, kode, count))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(allocators[i % 2],)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(results) == 8 * 8 and len(set(results)) == len(results)
+    assert all(nim.startswith(f"2026{kode}-") for nim in results)
+
+
+def test_restart_continues_after_persisted_high_water_mark(db):
+    kode = _fresh_kode()
+    before_crash = utils.NIMAllocator(block_size=10)
+    assert before_crash.allocate(db, 2026, kode, 2) == [f"2026{kode}-0001", f"2026{kode}-0002"]
+    assert _high_water(2026, kode) == 10
+
+    # Sisa blok di memori hilang saat crash; allocator baru mulai setelah blok yang tersimpan
+    after_restart = utils.NIMAllocator(block_size=10)
+    assert after_restart.allocate(db, 2026, kode) == [f"2026{kode}-0011"]
+    assert _high_water(2026, kode) == 20
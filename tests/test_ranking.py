@@ -0,0 +1,63 @@
+from conftest import pmb_module
+
+ranking = pmb_module("ranking")
+
+
+def test_top_k_orders_by_score_then_id():
+    scored = [(3, 70.0), (1, 90.0), (2, 90.0), (4, 50.0)]
+    assert ranking.top_k(scored, 3) == [(1, 90.0), (2, 90.0), (3, 70.0)]
+
+
+def test_top_k_with_no_room_is_empty():
+    assert ranking.top_k([(1, 90.0)], 0) == []
+    assert ranking.top_k([(1, 90.0)], -1) == []
+
+
+def test_rank_groups_splits_admitted_and_waitlist():
+    rows = [(1, 1, 1, 60.0), (2, 1, 1, 80.0), (3, 1, 1, 70.0), (4, 2, 1, 99.0)]
+    ranked = ranking.rank_groups(rows, {(1, 1): 1, (2, 1): 0}, waitlist_size=1)
+    assert ranked[(1, 1)] == ([(2, 80.0)], [(3, 70.0)])
+    assert ranked[(2, 1)] == ([], [(4, 99.0)])
+
+
+def test_rank_groups_with_exhausted_quota():
+    assert ranking.rank_groups([(1, 1, 1, 90.0)], {(1, 1): 0}, 0) == {(1, 1): ([], [])}
+
+
+def _score(client, ids_and_scores):
+    skor = [{"calon_id": i, "komponen": "tes", "nilai": nilai} for i, nilai in ids_and_scores]
+    assert client.put("/api/pmb/skor", json=skor).status_code == 200
+
+
+def test_ranking_approves_admitted_and_respects_used_quota(client, group, register):
+    prodi, jalur, kode = group
+    ids = [register() for _ in range(4)]
+    _score(client, zip(ids, [70.0, 90.0, 80.0, 60.0]))
+    body = {"weights": {"tes": 1.0}, "quotas": [{"program_studi_id": prodi, "jalur_masuk_id": jalur, "kuota": 2}],
+            "waitlist_size": 1, "approve": True}
+
+    response = client.post("/api/pmb/ranking", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    [result] = data["groups"]
+    assert [c["id"] for c in result["admitted"]] == [ids[1], ids[2]]
+    assert [c["id"] for c in result["waitlist"]] == [ids[0]]
+    assert data["approval"]["approved"] == sorted([ids[1], ids[2]])
+    for calon_id in (ids[1], ids[2]):
+        calon = client.get(f"/api/pmb/status/{calon_id}").json()
+        assert calon["status"] == "approved" and calon["nim"][4:].startswith(f"{kode}-")
+
+    # Kuota sudah habis oleh yang disetujui: tidak ada yang diterima lagi, bukan 500
+    response = client.post("/api/pmb/ranking", json=dict(body, waitlist_size=0))
+    assert response.status_code == 200
+    [result] = response.json()["groups"]
+    assert result["kuota"] == 0 and result["admitted"] == [] and result["waitlist"] == []
+
+
+def test_ranking_rejects_negative_quota_or_waitlist(client, group):
+    prodi, jalur, _ = group
+    quota = {"program_studi_id": prodi, "jalur_masuk_id": jalur, "kuota": -1}
+    assert client.post("/api/pmb/ranking", json={"weights": {"tes": 1.0}, "quotas": [quota]}).status_code == 422
+    quota["kuota"] = 1
+    body = {"weights": {"tes": 1.0}, "quotas": [quota], "waitlist_size": -1}
+    assert client.post("/api/pmb/ranking", json=body).status_code == 422
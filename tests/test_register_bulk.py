@@ -0,0 +1,9 @@
+def test_bulk_register_rejects_unsupported_media_type(client):
+    response = client.post("/api/pmb/register/bulk", data="a,b", headers={"content-type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_bulk_register_rejects_non_utf8_body(client):
+    body = "nama_lengkap,email\nJos\xe9,j@x.com\n".encode("latin-1")
+    response = client.post("/api/pmb/register/bulk", data=body, headers={"content-type": "text/csv"})
+    assert response.status_code == 400
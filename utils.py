@@ -1,29 +1,155 @@
+import csv
+import hashlib
+import io
+import json
+import threading
+from collections import deque
+from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models
+from fastapi import Request
+from fastapi.responses import Response
+from . import models, schemas
 from sqlalchemy.exc import IntegrityError
 
+NIM_BLOCK_SIZE = 50
+
+class NIMAllocator:
+    def __init__(self, block_size: int = NIM_BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session, tahun: int, kode_prodi: str, count: int = 1) -> List[str]:
+        kode = kode_prodi.zfill(3)[:3]
+        nims = self._take(tahun, kode, count)
+        while len(nims) < count:
+            block = self._reserve(db, tahun, kode, max(self.block_size, count - len(nims)))
+            nims.extend(self._take(tahun, kode, count - len(nims), block))
+        return nims
+
+    async def allocate_async(self, db: AsyncSession, tahun: int, kode_prodi: str, count: int = 1) -> List[str]:
+        kode = kode_prodi.zfill(3)[:3]
+        nims = self._take(tahun, kode, count)
+        while len(nims) < count:
+            block = await self._reserve_async(db, tahun, kode, max(self.block_size, count - len(nims)))
+            nims.extend(self._take(tahun, kode, count - len(nims), block))
+        return nims
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+    def _take(self, tahun: int, kode: str, count: int, new_block=None) -> List[str]:
+        with self._lock:
+            blocks = self._blocks.setdefault((tahun, kode), deque())
+            if new_block:
+                blocks.append(list(new_block))
+            nims = []
+            while blocks and len(nims) < count:
+                block = blocks[0]
+                take = min(count - len(nims), block[1] - block[0] + 1)
+                nims.extend(f"{tahun}{kode}-{seq:04d}" for seq in range(block[0], block[0] + take))
+                block[0] += take
+                if block[0] > block[1]:
+                    blocks.popleft()
+        return nims
+
+    def _reserve(self, db: Session, tahun: int, kode: str, size: int):
+        with Session(bind=db.get_bind()) as session:
+            while True:
+                updated = session.execute(_bump_seq(tahun, kode, size)).rowcount
+                if not updated:
+                    session.add(models.NIMSequence(tahun=tahun, kode_prodi=kode, seq=size))
+                try:
+                    session.flush()
+                    high_water = session.scalar(_select_seq(tahun, kode))
+                    session.commit()
+                    break
+                except IntegrityError:
+                    session.rollback()
+        return high_water - size + 1, high_water
+
+    async def _reserve_async(self, db: AsyncSession, tahun: int, kode: str, size: int):
+        async with AsyncSession(bind=db.bind) as session:
+            while True:
+                updated = (await session.execute(_bump_seq(tahun, kode, size))).rowcount
+                if not updated:
+                    session.add(models.NIMSequence(tahun=tahun, kode_prodi=kode, seq=size))
+                try:
+                    await session.flush()
+                    high_water = await session.scalar(_select_seq(tahun, kode))
+                    await session.commit()
+                    break
+                except IntegrityError:
+                    await session.rollback()
+        return high_water - size + 1, high_water
+
+def _bump_seq(tahun: int, kode: str, size: int):
+    return (
+        update(models.NIMSequence)
+        .where(models.NIMSequence.tahun == tahun, models.NIMSequence.kode_prodi == kode)
+        .values(seq=models.NIMSequence.seq + size)
+    )
+
+def _select_seq(tahun: int, kode: str):
+    return select(models.NIMSequence.seq).where(models.NIMSequence.tahun == tahun, models.NIMSequence.kode_prodi == kode)
+
+nim_allocator = NIMAllocator()
+
 def generate_nim(db: Session, tahun: int, kode_prodi: str) -> str:
-    kode = kode_prodi.zfill(3)[:3]
-    while True:
-        seq_row = db.query(models.NIMSequence).filter(models.NIMSequence.tahun == tahun, models.NIMSequence.kode_prodi == kode).first()
-        if seq_row:
-            seq_row.seq += 1
-            db.add(seq_row)
-            try:
-                db.commit()
-                break
-            except IntegrityError:
-                db.rollback()
-                continue
-        else:
-            seq_row = models.NIMSequence(tahun=tahun, kode_prodi=kode, seq=1)
-            db.add(seq_row)
-            try:
-                db.commit()
-                db.refresh(seq_row)
-                break
-            except IntegrityError:
-                db.rollback()
-                continue
-    nim = f"{tahun}{kode}-{seq_row.seq:04d}"
-    return nim
+    return nim_allocator.allocate(db, tahun, kode_prodi)[0]
+
+async def generate_nim_async(db: AsyncSession, tahun: int, kode_prodi: str) -> str:
+    return (await nim_allocator.allocate_async(db, tahun, kode_prodi))[0]
+
+def parse_bulk_rows(body: bytes, content_type: str):
+    return _iter_bulk_rows(body.decode("utf-8-sig"), content_type)
+
+def _iter_bulk_rows(text: str, content_type: str):
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        for row_no, row in enumerate(reader, start=1):
+            yield row_no, {k: (v if v != "" else None) for k, v in row.items()}, None
+        return
+    for row_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, None, f"JSON invalid: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield row_no, None, "Baris harus berupa objek JSON"
+            continue
+        yield row_no, data, None
+
+def calon_cache_entry(calon):
+    body = schemas.CalonOut.from_orm(calon).json().encode()
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def iter_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if v is None else _export_value(v) for v in row])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson(rows, columns):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=_export_value) + "\n"
+
+def _export_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value